@@ -0,0 +1,151 @@
+from startup import lazy_import
+from utils import safe_cell, escape_md
+from facets import build_facet_index, encode_column
+from sheets import derived
+from columns import IDX_TASHKILOT, IDX_SANASI
+
+TOP_EMPLOYERS = 15
+
+def _pct(part, total) -> float:
+    return round((part / total * 100), 2) if total else 0.0
+
+class Analytics:
+    """
+    Jadval nusxasining kategoriyalarga kodlangan ko'rinishi.
+    Fakultet, mutaxassislik va holat kodlari FacetIndex bilan umumiy; sana va tashkilot shu yerda kodlanadi.
+    Barcha kesimlar bitta np.bincount bilan hisoblanadi.
+    """
+
+    def __init__(self, rows):
+        np = lazy_import("numpy")
+        pd = lazy_import("pandas")
+        index = derived("facets", rows, build_facet_index)
+        body = rows[1:]
+
+        self.size = index.size
+        self.fakultet_values = index.values["fakultet"]
+        self.mutaxassislik_values = index.values["mutaxassislik"]
+        self.fakultet = index.codes["fakultet"]
+        self.mutaxassislik = index.codes["mutaxassislik"]
+        self.active = index.codes["status"] == 0
+
+        # Tashkilot: bo'sh qiymat ham kodlanadi, hisoblashda chiqarib tashlanadi
+        self.tashkilot_values, self.tashkilot = encode_column([safe_cell(r, IDX_TASHKILOT) for r in body])
+        self._tashkilot_empty = self.tashkilot_values.index("") if "" in self.tashkilot_values else -1
+
+        # Sana: faqat noyob qiymatlar parse qilinadi, so'ng kodlar orqali qatorlarga yoyiladi
+        san_values, san_codes = encode_column([safe_cell(r, IDX_SANASI) for r in body])
+        san_series = pd.Series(san_values, dtype="object")
+        # ISO (YYYY-MM-DD) alohida: dayfirst unda oy va kunni almashtirib yuboradi
+        parsed = pd.to_datetime(san_series, format="ISO8601", errors="coerce").fillna(
+            pd.to_datetime(san_series, format="mixed", dayfirst=True, errors="coerce")
+        )
+        months = parsed.dt.strftime("%Y-%m").tolist()
+        self.month_values = sorted({m for m in months if isinstance(m, str)})
+        month_index = {m: i for i, m in enumerate(self.month_values)}
+        lut = np.array([month_index.get(m, -1) if isinstance(m, str) else -1 for m in months], dtype=np.int32)
+        self.hired_month = lut[san_codes]
+
+        self._cube = None
+        self._hist = None
+        self._employer_counts = None
+
+    def cube(self):
+        """fakultet × mutaxassislik × holat (0 — faol, 1 — faol emas) sonlari massivi."""
+        if self._cube is None:
+            np = lazy_import("numpy")
+            nf, nm = len(self.fakultet_values), len(self.mutaxassislik_values)
+            key = (self.fakultet.astype(np.int64) * nm + self.mutaxassislik) * 2 + (~self.active)
+            self._cube = np.bincount(key, minlength=nf * nm * 2).reshape(nf, nm, 2)
+        return self._cube
+
+    def by_mutaxassislik(self):
+        return self.cube().sum(axis=0)
+
+    def by_fakultet(self):
+        return self.cube().sum(axis=1)
+
+    def hiring_histogram(self):
+        """Faol talabalarning ishga kirgan oylari bo'yicha sonlari."""
+        if self._hist is None:
+            np = lazy_import("numpy")
+            m = self.hired_month[self.active & (self.hired_month >= 0)]
+            self._hist = np.bincount(m, minlength=len(self.month_values))
+        return self._hist
+
+    def top_employers(self, n: int = TOP_EMPLOYERS):
+        """Faol talabalar eng ko'p ishlayotgan tashkilotlar: [(nom, soni), ...]."""
+        np = lazy_import("numpy")
+        if self._employer_counts is None:
+            counts = np.bincount(self.tashkilot[self.active], minlength=len(self.tashkilot_values))
+            if self._tashkilot_empty >= 0:
+                counts[self._tashkilot_empty] = 0
+            self._employer_counts = counts
+        counts = self._employer_counts
+        n = min(n, int((counts > 0).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(counts, -n)[-n:]
+        top = top[np.argsort(-counts[top], kind="stable")]
+        return [(self.tashkilot_values[i], int(counts[i])) for i in top]
+
+def build_analytics(rows) -> Analytics:
+    return Analytics(rows)
+
+# ---------------- Matnlar (Markdown) ----------------
+def _header(a: Analytics, title: str):
+    total_active = int(a.active.sum())
+    return [
+        f"📊 *{title}:*\n",
+        f"👥 *Jami talabalar soni:* {a.size} ta",
+        f"🟢 *Faol shartnoma ega talabalarning (umumiy) soni:* {total_active} ta ({_pct(total_active, a.size)}%)\n",
+    ]
+
+def _breakdown_lines(values, counts):
+    lines = []
+    for name, (act, inact) in zip(values, counts.tolist()):
+        tot = act + inact
+        if tot:
+            lines.append(f"✅ *{escape_md(name)}:* jami {tot} | faol: {act} ({_pct(act, tot)}%)")
+    return lines
+
+def text_by_mutaxassislik(a: Analytics) -> str:
+    lines = _header(a, "Statistika (W ustuni bo‘yicha)")
+    lines += _breakdown_lines(a.mutaxassislik_values, a.by_mutaxassislik())
+    return "\n".join(lines)
+
+def text_by_fakultet(a: Analytics) -> str:
+    lines = _header(a, "Statistika (fakultetlar bo‘yicha)")
+    lines += _breakdown_lines(a.fakultet_values, a.by_fakultet())
+    return "\n".join(lines)
+
+def text_crosstab(a: Analytics) -> str:
+    lines = _header(a, "Kesim: fakultet × mutaxassislik × holat")
+    cube = a.cube()
+    for f, fname in enumerate(a.fakultet_values):
+        act, inact = (int(x) for x in cube[f].sum(axis=0))
+        if not act + inact:
+            continue
+        lines.append(f"\n🏷 *{escape_md(fname)}* — jami {act + inact} | faol: {act} ({_pct(act, act + inact)}%)")
+        for m, (m_act, m_inact) in enumerate(cube[f].tolist()):
+            if m_act + m_inact:
+                lines.append(f"   • {escape_md(a.mutaxassislik_values[m])}: {m_act + m_inact} | faol: {m_act} ({_pct(m_act, m_act + m_inact)}%)")
+    return "\n".join(lines)
+
+def text_hiring(a: Analytics) -> str:
+    lines = _header(a, "Ishga kirish sanalari (oylar bo‘yicha)")
+    hist = a.hiring_histogram()
+    dated = int(hist.sum())
+    lines.append(f"📅 *Sanasi ko‘rsatilgan faol talabalar:* {dated} ta\n")
+    peak = int(hist.max()) if len(hist) else 0
+    for month, cnt in zip(a.month_values, hist.tolist()):
+        if cnt:
+            bar = "█" * max(1, round(cnt / peak * 20)) if peak else ""
+            lines.append(f"`{month}` {bar} {cnt}")
+    return "\n".join(lines)
+
+def text_employers(a: Analytics, n: int = TOP_EMPLOYERS) -> str:
+    lines = _header(a, f"Eng ko‘p ishga olgan tashkilotlar (top {n})")
+    for i, (name, cnt) in enumerate(a.top_employers(n), start=1):
+        lines.append(f"{i}. *{escape_md(name)}* — {cnt} ta")
+    return "\n".join(lines)
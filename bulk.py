@@ -0,0 +1,195 @@
+import asyncio
+import csv
+import io
+import logging
+import re
+from time import localtime
+from telegram import Update
+from telegram.constants import ChatAction
+from telegram.ext import ContextTypes
+from config import REQUIRED_STATUS
+from sheets import load_rows, derived_async
+from columns import HEMIS_UID, IDX_HEMIS, IDX_JSH, IDX_STAT
+from handlers import row_to_item
+from sender import OUTBOX
+from startup import lazy_import
+from utils import EXPORT_COLUMNS, safe_cell, escape_md, send_error_message, log_user_action
+
+logger = logging.getLogger(__name__)
+
+BULK_XLSX_LIMIT = 2000     # Bundan ko'p qator bo'lsa natija CSV ko'rinishida yuboriladi
+BULK_MAX_IDS = 50000
+NOT_FOUND_PREVIEW = 10
+
+# Qidiruv tartibi: (ustun, natija turi)
+ID_COLUMNS = [
+    (HEMIS_UID, "HEMIS UID"),
+    (IDX_HEMIS, "HEMIS ID"),
+    (IDX_JSH, "JSHSHIR"),
+]
+
+_SPLIT_RE = re.compile(r"[\r\n,;\t]+")
+
+def _normalize(value) -> str:
+    """Identifikatorni solishtirish uchun: bo'shliqlarsiz, Excel'dagi 123.0 ko'rinishidagi sonlar butun."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "".join(str(value).split())
+
+def build_id_index(rows):
+    """Har bir identifikator turi uchun xesh indeks: qiymat -> qator indeksi (birinchi uchragani)."""
+    index = []
+    for col, _ in ID_COLUMNS:
+        mapping = {}
+        for i in range(1, len(rows)):
+            r = rows[i]
+            if col >= len(r):
+                continue
+            key = str(r[col]).strip()
+            if " " in key:
+                key = _normalize(key)
+            if key:
+                mapping.setdefault(key, i)
+        index.append(mapping)
+    return index
+
+def parse_ids_text(text: str):
+    """Ko'p qatorli matndan identifikatorlar ro'yxati (tartib va takrorlar saqlanadi)."""
+    return [v for v in (_normalize(p) for p in _SPLIT_RE.split(text or "")) if v]
+
+def _skip_header(ids):
+    """Birinchi qiymatda raqam bo'lmasa (masalan, "hemis_id" yoki "JSHSHIR"), u sarlavha deb olib tashlanadi."""
+    if ids and not any(ch.isdigit() for ch in ids[0]):
+        return ids[1:]
+    return ids
+
+def parse_ids_file(data: bytes, filename: str):
+    """CSV yoki XLSX faylning birinchi ustunidagi identifikatorlar (sarlavha qatori bo'lsa, tashlab yuboriladi)."""
+    if filename.lower().endswith(".xlsx"):
+        openpyxl = lazy_import("openpyxl")
+        wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            return _skip_header([v for v in (_normalize(row[0]) for row in ws.iter_rows(max_col=1, values_only=True) if row) if v])
+        finally:
+            wb.close()
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("cp1251")
+    return _skip_header([v for v in (_normalize(row[0]) for row in csv.reader(io.StringIO(text)) if row) if v])
+
+async def resolve_ids(rows, ids):
+    """Har bir kiritilgan identifikator uchun (qator indeksi yoki None, natija turi)."""
+    index = await derived_async("id_index", rows, build_id_index)
+    out = []
+    for ident in ids:
+        for (_, kind), mapping in zip(ID_COLUMNS, index):
+            i = mapping.get(ident)
+            if i is not None:
+                out.append((i, kind))
+                break
+        else:
+            out.append((None, ""))
+    return out
+
+def _result_rows(rows, ids, resolved):
+    """Natija jadvali qatorlari: kiritilgan qiymat, holat, turi va talaba ma'lumotlari."""
+    header = ["kiritilgan", "natija", "turi"] + EXPORT_COLUMNS
+    yield header
+    cache = {}
+    for ident, (i, kind) in zip(ids, resolved):
+        if i is None:
+            yield [ident, "topilmadi", ""] + [""] * len(EXPORT_COLUMNS)
+            continue
+        item = cache.get(i)
+        if item is None:
+            item = cache[i] = row_to_item(rows[i])
+        yield [ident, "topildi", kind] + [item.get(col, "") for col in EXPORT_COLUMNS]
+
+def build_result_file(rows, ids, resolved):
+    """Natijani faylga yozadi (qatorma-qator): kichik ro'yxatlar XLSX, kattalari CSV. (bytes, fayl nomi)"""
+    stamp = "_".join(str(x) for x in localtime()[:6])
+    if len(ids) <= BULK_XLSX_LIMIT:
+        openpyxl = lazy_import("openpyxl")
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Natija")
+        for line in _result_rows(rows, ids, resolved):
+            ws.append(line)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue(), f"Bulk-{stamp}.xlsx"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line in _result_rows(rows, ids, resolved):
+        writer.writerow(line)
+    return buffer.getvalue().encode("utf-8-sig"), f"Bulk-{stamp}.csv"
+
+def _summary_text(ids, resolved, rows) -> str:
+    found = [i for i, _ in resolved if i is not None]
+    unique_found = set(found)
+    active = sum(1 for i in unique_found if REQUIRED_STATUS.lower() in safe_cell(rows[i], IDX_STAT).lower())
+    missing = [ident for ident, (i, _) in zip(ids, resolved) if i is None]
+    missing_unique = list(dict.fromkeys(missing))
+    pct = round((active / len(unique_found) * 100), 2) if unique_found else 0.0
+
+    lines = [
+        "📥 *Ommaviy qidiruv natijasi*\n",
+        f"🔢 *Kiritilgan:* {len(ids)} ta (noyob: {len(set(ids))})",
+        f"✅ *Topildi:* {len(found)} ta ({len(unique_found)} nafar talaba)",
+        f"❌ *Topilmadi:* {len(missing)} ta",
+        f"🟢 *Faol shartnomaga ega:* {active} ta ({pct}%)",
+    ]
+    if missing:
+        preview = ", ".join(f"`{escape_md(m)}`" for m in missing_unique[:NOT_FOUND_PREVIEW])
+        more = f" va yana {len(missing_unique) - NOT_FOUND_PREVIEW} ta" if len(missing_unique) > NOT_FOUND_PREVIEW else ""
+        lines.append(f"\n🔍 Topilmaganlar: {preview}{more}")
+    return "\n".join(lines)
+
+async def _bulk_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, ids, source: str):
+    chat_id = update.effective_chat.id
+    if not ids:
+        await send_error_message(chat_id, context, "❌ Identifikatorlar topilmadi. Har qatorga bitta HEMIS UID / HEMIS ID / JSHSHIR yozing.")
+        return
+    if len(ids) > BULK_MAX_IDS:
+        await send_error_message(chat_id, context, f"❌ Bir martada ko‘pi bilan {BULK_MAX_IDS} ta identifikator qabul qilinadi.")
+        return
+
+    await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_DOCUMENT)
+    rows = await load_rows()
+    resolved = await resolve_ids(rows, ids)
+    data, filename = await asyncio.to_thread(build_result_file, rows, ids, resolved)
+
+    await OUTBOX.submit(chat_id, lambda: update.message.reply_text(_summary_text(ids, resolved, rows), parse_mode="Markdown"))
+    await OUTBOX.submit(chat_id, lambda: context.bot.send_document(
+        chat_id=chat_id,
+        document=data,
+        filename=filename,
+        caption="📤 Har bir kiritilgan qiymat bo‘yicha natija",
+    ))
+    await log_user_action(chat_id, f"bulk_{source}_{len(ids)}")
+
+# ---------------- Handlerlar ----------------
+async def bulk_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ko'p qatorli xabar: har qatorda bitta identifikator."""
+    chat_id = update.effective_chat.id
+    try:
+        await _bulk_reply(update, context, parse_ids_text(update.message.text), "text")
+    except Exception as e:
+        logger.error(f"Ommaviy qidiruvda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Ommaviy qidiruvda xato: {str(e)}")
+
+async def bulk_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Yuklangan CSV/XLSX fayl: birinchi ustunda identifikatorlar."""
+    chat_id = update.effective_chat.id
+    doc = update.message.document
+    try:
+        tg_file = await doc.get_file()
+        data = bytes(await tg_file.download_as_bytearray())
+        ids = await asyncio.to_thread(parse_ids_file, data, doc.file_name or "")
+        await _bulk_reply(update, context, ids, "file")
+    except Exception as e:
+        logger.error(f"Fayldan ommaviy qidiruvda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Faylni o‘qishda xato: {str(e)}")
@@ -0,0 +1,13 @@
+# Jadval ustun indekslari (0-based)
+HEMIS_UID    = 0   # A
+IDX_HEMIS    = 2   # C
+IDX_FIO      = 3   # D
+IDX_STAT     = 4   # E
+IDX_JSH      = 5   # F
+IDX_W        = 22  # W
+IDX_LAVOZIM  = 29  # AD
+IDX_TASHKILOT= 30  # AE
+IDX_SANASI   = 34  # AI
+IDX_GURUH    = 14  # O
+IDX_FAKULTET = 23  # X
+IDX_MUTAXASSISLIK = 22  # W
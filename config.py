@@ -7,4 +7,16 @@ BOT_TOKEN = env.str("BOT_TOKEN")
 SHEET_ID = env.str("SHEET_ID")
 WORKSHEET_TITLE = env.str("WORKSHEET_TITLE", default="Sheet1")
 REQUIRED_STATUS = env.str("REQUIRED_STATUS", default="faol mehnat shartnomasiga ega")
-ADMIN_IDS = env.list("ADMIN_IDS", subcast=int, default=[]) 
\ No newline at end of file
+ADMIN_IDS = env.list("ADMIN_IDS", subcast=int, default=[])
+PREWARM = env.bool("PREWARM", default=True)  # Og'ir modullarni polling boshlangach fon rejimida yuklash
+PREWARM_DELAY = env.float("PREWARM_DELAY", default=5.0)
+
+# Rejalashtirilgan hisobotlar
+REPORT_TIME = env.str("REPORT_TIME", default="08:00")      # HH:MM
+REPORT_WEEKDAY = env.int("REPORT_WEEKDAY", default=1)      # 0 = yakshanba, 1 = dushanba, ...
+REPORT_TZ = env.str("REPORT_TZ", default="Asia/Tashkent")
+REPORTS_DIR = env.str("REPORTS_DIR", default="reports")
+REPORTS_KEEP = env.int("REPORTS_KEEP", default=7)          # REPORTS_DIR da saqlanadigan oxirgi hisobotlar soni
+
+# Jadvalni fonda yangilash va o'zgarishlarni kuzatish (soniya)
+REFRESH_INTERVAL = env.int("REFRESH_INTERVAL", default=300)
@@ -0,0 +1,76 @@
+from typing import List, Tuple
+from config import REQUIRED_STATUS
+from startup import lazy_import
+from utils import safe_cell
+from columns import IDX_STAT, IDX_GURUH, IDX_FAKULTET, IDX_MUTAXASSISLIK
+
+# Facet ierarxiyasi: (kalit, ustun indeksi, sarlavha). Holat (E ustuni) oxirgi bosqich.
+FACETS = [
+    ("fakultet", IDX_FAKULTET, "🏷 Fakultet"),
+    ("mutaxassislik", IDX_MUTAXASSISLIK, "🎓 Mutaxassislik"),
+    ("guruh", IDX_GURUH, "👥 Guruh"),
+    ("status", IDX_STAT, "💼 Holat"),
+]
+
+STATUS_VALUES = ["🟢 Faol shartnoma", "🔴 Shartnomasiz"]
+
+def encode_column(col: List[str]):
+    """Ustun qiymatlarini kategoriyalarga kodlaydi: (saralangan qiymatlar, int32 kodlar massivi)."""
+    np = lazy_import("numpy")
+    values = sorted(set(col), key=lambda x: x.lower())
+    mapping = {v: i for i, v in enumerate(values)}
+    codes = np.fromiter((mapping[v] for v in col), dtype=np.int32, count=len(col))
+    return values, codes
+
+class FacetIndex:
+    """
+    Har bir facet uchun teskari indeks: qiymat kodi -> saralangan qator id'lari massivi.
+    Qator id'si i jadvaldagi rows[i + 1] ga mos keladi (0-qator header).
+    """
+
+    def __init__(self, rows):
+        np = lazy_import("numpy")
+        body = rows[1:]
+        self.size = len(body)
+        self.values = {}
+        self.codes = {}
+        self.postings = {}
+        for key, idx, _ in FACETS:
+            if key == "status":
+                req = REQUIRED_STATUS.lower()
+                values = STATUS_VALUES
+                codes = np.fromiter(
+                    (0 if req in safe_cell(r, idx).lower() else 1 for r in body),
+                    dtype=np.int32, count=self.size,
+                )
+            else:
+                values, codes = encode_column([safe_cell(r, idx) or "Noma'lum" for r in body])
+            # Barqaror saralash: har bir kod ichida id'lar o'sish tartibida qoladi
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            counts = np.bincount(codes, minlength=len(values))
+            self.values[key] = values
+            self.codes[key] = codes
+            self.postings[key] = np.split(order, np.cumsum(counts)[:-1])
+
+    def select(self, selection: List[Tuple[str, int]]):
+        """Tanlangan (facet, kod) juftliklari kesishmasidagi qator id'lari."""
+        np = lazy_import("numpy")
+        ids = None
+        # Eng kichik ro'yxatdan boshlab kesishtiramiz
+        for key, code in sorted(selection, key=lambda kc: len(self.postings[kc[0]][kc[1]])):
+            p = self.postings[key][code]
+            ids = p if ids is None else np.intersect1d(ids, p, assume_unique=True)
+        if ids is None:
+            return np.arange(self.size, dtype=np.int32)
+        return ids
+
+    def counts(self, key: str, ids):
+        """ids ichida facet qiymatlari bo'yicha sonlar (kod bo'yicha massiv)."""
+        np = lazy_import("numpy")
+        return np.bincount(self.codes[key][ids], minlength=len(self.values[key]))
+
+    def active_count(self, ids) -> int:
+        return int(self.counts("status", ids)[0])
+
+def build_facet_index(rows) -> FacetIndex:
+    return FacetIndex(rows)
@@ -1,36 +1,61 @@
 import asyncio
 import io
+from array import array
 from collections import Counter
-import matplotlib.pyplot as plt
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
 from telegram.constants import ChatAction
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes, CallbackQueryHandler
 from config import REQUIRED_STATUS, ADMIN_IDS
-from sheets import load_rows
+from cachetools import TTLCache
+from sheets import load_rows, rows_version, derived_async
+from columns import HEMIS_UID, IDX_HEMIS, IDX_FIO, IDX_STAT, IDX_JSH, IDX_W, IDX_LAVOZIM, IDX_TASHKILOT, IDX_SANASI, IDX_GURUH, IDX_FAKULTET, IDX_MUTAXASSISLIK
 from utils import safe_cell, escape_md, split_and_send_text, send_error_message, delete_previous_page, export_to_excel, log_user_action, get_user_stats, update_sheet_row
 from formatters import format_card, format_results_block
-from keyboards import reply_main_menu, pagination_keyboard
+from keyboards import reply_main_menu, pagination_keyboard, facet_keyboard
+from facets import FACETS, build_facet_index
+from analytics import build_analytics, text_by_mutaxassislik, text_by_fakultet, text_crosstab, text_hiring, text_employers
+from startup import lazy_import
+from sender import OUTBOX
 
 logger = logging.getLogger(__name__)
 
-# Ustun indekslari (0-based)
-HEMIS_UID    = 0   # A
-IDX_HEMIS    = 2   # C
-IDX_FIO      = 3   # D
-IDX_STAT     = 4   # E
-IDX_JSH      = 5   # F
-IDX_W        = 22  # W
-IDX_LAVOZIM  = 29  # AD
-IDX_TASHKILOT= 30  # AE
-IDX_SANASI   = 34  # AI
-IDX_GURUH    = 14  # O
-IDX_FAKULTET = 23  # X
-IDX_MUTAXASSISLIK = 22  # W
-
 PER_PAGE = 7
 
+# Inline rejim sozlamalari
+INLINE_LIMIT = 20          # Bitta javobdagi kartalar soni
+INLINE_MIN_QUERY = 2       # Qisqaroq so'rovlar jadvalni skanerlamaydi
+INLINE_DEBOUNCE = 0.35     # Soniya: shu vaqt ichida yangi harf kelsa, eski so'rov bekor qilinadi
+INLINE_CACHE_TIME = 60     # Telegram tomonidagi kesh (soniya)
+
+INLINE_CACHE_IDS = 100_000     # Keshdagi jami qator indekslari chegarasi (~400 KB)
+INLINE_CACHE_MAX_IDS = 5000    # Bundan ko'p natijali (odatda juda qisqa) so'rovlar keshlanmaydi
+
+# (versiya, so'rov) -> mos qator indekslari (ixcham int massiv, prefiks bo'yicha qayta ishlatiladi).
+# Hajm indekslar soni bilan o'lchanadi: ikki xonali raqamli so'rovlar jadvalning katta qismiga mos keladi.
+_inline_cache = TTLCache(maxsize=INLINE_CACHE_IDS, ttl=300, getsizeof=len)
+
 # ---------------- Helper: natijalarni qurish ----------------
+def row_to_item(r):
+    """Jadval qatorini karta uchun lug'atga aylantiradi."""
+    status = safe_cell(r, IDX_STAT)
+    item = {
+        "hemisuid": safe_cell(r, HEMIS_UID),
+        "fakultet": safe_cell(r, IDX_FAKULTET),
+        "mutaxassislik": safe_cell(r, IDX_MUTAXASSISLIK),
+        "guruh": safe_cell(r, IDX_GURUH),
+        "fio": safe_cell(r, IDX_FIO),
+        "hemis": safe_cell(r, IDX_HEMIS),
+        "status": status,
+        "jshshir": safe_cell(r, IDX_JSH),
+    }
+    if REQUIRED_STATUS.lower() in (status or "").lower():
+        item["lavozim"]   = safe_cell(r, IDX_LAVOZIM)
+        item["tashkilot"] = safe_cell(r, IDX_TASHKILOT)
+        item["sanasi"]    = safe_cell(r, IDX_SANASI)
+    return item
+
 def build_results_from_rows(rows, query: str):
     """rows = get_all_values() — list of lists. Returns list of dicts."""
     res = []
@@ -40,30 +65,12 @@ def build_results_from_rows(rows, query: str):
     for r in rows[1:]:
         hemisuid = safe_cell(r, HEMIS_UID)
         fio = safe_cell(r, IDX_FIO)
-        guruh = safe_cell(r, IDX_GURUH)
-        fakultet = safe_cell(r, IDX_FAKULTET)
-        mutaxassislik = safe_cell(r, IDX_MUTAXASSISLIK)
         hemis = safe_cell(r, IDX_HEMIS)
         jsh = safe_cell(r, IDX_JSH)
-        status = safe_cell(r, IDX_STAT)
         if not (fio or hemis or jsh or hemisuid):
             continue
         if q in fio.lower() or q in hemis.lower() or q in jsh.lower() or q in hemisuid.lower():
-            item = {
-                "hemisuid": hemisuid,
-                "fakultet": fakultet,
-                "mutaxassislik": mutaxassislik,
-                "guruh": guruh,
-                "fio": fio,
-                "hemis": hemis,
-                "status": status,
-                "jshshir": jsh,
-            }
-            if REQUIRED_STATUS.lower() in (status or "").lower():
-                item["lavozim"]   = safe_cell(r, IDX_LAVOZIM)
-                item["tashkilot"] = safe_cell(r, IDX_TASHKILOT)
-                item["sanasi"]    = safe_cell(r, IDX_SANASI)
-            res.append(item)
+            res.append(row_to_item(r))
     return res
 
 def _results_summary(results):
@@ -74,17 +81,33 @@ def _results_summary(results):
 
 # ---------------- /start ----------------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
     # Clear any previous cache for this chat
     context.user_data.clear()
-    await update.message.reply_text(
+    await OUTBOX.submit(chat_id, lambda: update.message.reply_text(
         "👋 *Assalomu alaykum!*\n\n"
         "Ism/familiya (qismi bo‘lsa ham), HEMIS ID yoki JSHSHIR yuboring — men jadvaldan topib beraman.\n\n"
+        "📥 Bir nechta ID'ni har qatorga bittadan yoki CSV/XLSX fayl qilib yuborsangiz, barchasini birdan tekshiraman.\n\n"
         "📌 Pastdagi tugmalardan foydalanishingiz mumkin:",
         parse_mode="Markdown",
         reply_markup=reply_main_menu()
-    )
+    ))
     await log_user_action(update.effective_chat.id, "start")
 
+# ---------------- Statistika matni ----------------
+# /stat <variant> -> matn quruvchi
+STAT_VARIANTS = {
+    "fakultet": text_by_fakultet,
+    "kesim": text_crosstab,
+    "sana": text_hiring,
+    "tashkilot": text_employers,
+}
+
+async def build_stat_text(rows, variant: str = None) -> str:
+    """Statistika matni (Markdown). Standart — W ustuni bo'yicha; variant: fakultet, kesim, sana, tashkilot."""
+    analytics = await derived_async("analytics", rows, build_analytics)
+    return STAT_VARIANTS.get(variant, text_by_mutaxassislik)(analytics)
+
 # ---------------- Statistika (/stat yoki tugma) ----------------
 async def stat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -96,38 +119,15 @@ async def stat(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await send_error_message(chat_id, context, "❌ *Jadval bo‘sh.*")
             return
 
-        total_students = len(rows) - 1
-        total_active = 0
-        total_per_w = Counter()
-        active_per_w = Counter()
-
-        for r in rows[1:]:
-            w_val = safe_cell(r, IDX_W) or "Noma'lum"
-            status = safe_cell(r, IDX_STAT)
-            total_per_w[w_val] += 1
-            if REQUIRED_STATUS.lower() in (status or "").lower():
-                active_per_w[w_val] += 1
-                total_active += 1
-
-        overall_pct = round((total_active / total_students * 100), 2) if total_students else 0.0
-
-        lines = [
-            "📊 *Statistika (W ustuni bo‘yicha):*\n",
-            f"👥 *Jami talabalar soni:* {total_students} ta",
-            f"🟢 *Faol shartnoma ega talabalarning (umumiy) soni:* {total_active} ta ({overall_pct}%)\n",
-        ]
-
-        for w_key in sorted(total_per_w.keys(), key=lambda x: (x.lower() if isinstance(x, str) else str(x))):
-            tot = total_per_w[w_key]
-            act = active_per_w.get(w_key, 0)
-            pct_group = round((act / tot * 100), 2) if tot else 0.0
-            lines.append(f"✅ *{escape_md(w_key)}:* jami {tot} | faol: {act} ({pct_group}%)")
-
-        text = "\n".join(lines)
+        variant = (context.args[0].lower() if context.args else None)
+        if variant is not None and variant not in STAT_VARIANTS:
+            await send_error_message(chat_id, context, "❌ Format: `/stat`, `/stat fakultet`, `/stat kesim`, `/stat sana` yoki `/stat tashkilot`")
+            return
+        text = await build_stat_text(rows, variant)
 
         await delete_previous_page(chat_id, context)
         await split_and_send_text(chat_id, text, context)
-        await log_user_action(chat_id, "stat")
+        await log_user_action(chat_id, f"stat_{variant}" if variant else "stat")
     except Exception as e:
         logger.error(f"Statistikada xato: {e}")
         await send_error_message(chat_id, context, f"❌ Statistika olishda xato: {str(e)}")
@@ -139,7 +139,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Reply tugma bosilganda ularni qidiruv deb o'tkazmaymiz
     if text in ("🔎 Qidiruv", "Qidiruv"):
-        await update.message.reply_text("🔎 Qidiruvni boshlash uchun: *ism/familiya (qismi)* yoki *HEMIS ID / JSHSHIR* yuboring.", parse_mode="Markdown")
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text("🔎 Qidiruvni boshlash uchun: *ism/familiya (qismi)* yoki *HEMIS ID / JSHSHIR* yuboring.", parse_mode="Markdown"))
         return
     if text in ("📊 Statistika", "Statistika"):
         await stat(update, context)
@@ -147,9 +147,12 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if text in ("📉 Grafik", "grafik", "Grafik"):
         await grafik(update, context)
         return
+    if text in ("🧭 Filtr", "Filtr"):
+        await facet_start(update, context)
+        return
 
     if not text:
-        await update.message.reply_text("📝 Iltimos, qidirish uchun matn yuboring.")
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text("📝 Iltimos, qidirish uchun matn yuboring."))
         return
 
     await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
@@ -171,8 +174,9 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Qidiruvda xato: {e}")
         await send_error_message(chat_id, context, f"❌ Qidiruvda xato: {str(e)}")
 
-# ---------------- Sahifa yuborish (yangi xabar qilib) ----------------
-async def send_page(chat_id: int, context: ContextTypes.DEFAULT_TYPE, page: int):
+# ---------------- Sahifa yuborish (tahrirlash yoki yangi xabar) ----------------
+async def send_page(chat_id: int, context: ContextTypes.DEFAULT_TYPE, page: int, edit_message_id: int = None):
+    """edit_message_id berilsa o'sha xabar tahrirlanadi; aks holda yangi xabar yuborilib, eskisi fonda o'chiriladi."""
     results = context.user_data.get("results")
     if not results:
         return
@@ -186,12 +190,24 @@ async def send_page(chat_id: int, context: ContextTypes.DEFAULT_TYPE, page: int)
     header = (
         f"📋 *Jami topilgan talabalar soni:* {total} ta\n"
         f"🟢 *my.mehnat.uz da mehnat shartnomasiga ega talabalar soni:* {active} ta ({pct}%)\n"
-        f"📄 *Sahifalar:* {page}/{total_pages}\n\n"
+        f"📄 *Sahifa:* {page}/{total_pages}\n\n"
     )
     text = header + format_results_block(page_items)
+    markup = pagination_keyboard(page, total_pages)
+
+    if edit_message_id:
+        try:
+            await OUTBOX.submit(chat_id, lambda: context.bot.edit_message_text(chat_id=chat_id, message_id=edit_message_id, text=text, parse_mode="Markdown", reply_markup=markup))
+            context.user_data.update({"page_msg_id": edit_message_id, "page": page})
+            return
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                context.user_data["page"] = page
+                return
+            logger.warning(f"Sahifani tahrirlab bo‘lmadi, yangi xabar yuboriladi: {e}")
 
+    sent = await OUTBOX.submit(chat_id, lambda: context.bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown", reply_markup=markup))
     await delete_previous_page(chat_id, context)
-    sent = await context.bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown", reply_markup=pagination_keyboard(page, total_pages))
     context.user_data["page_msg_id"] = sent.message_id
     context.user_data["page"] = page
 
@@ -230,98 +246,271 @@ async def inline_pagination_handler(update: Update, context: ContextTypes.DEFAUL
         return
 
     try:
-        results = context.user_data.get("results")
-        if not results:
+        if not context.user_data.get("results"):
             logger.warning("Sahifalash uchun natijalar topilmadi.")
             return
 
-        total, active, pct = _results_summary(results)
-        total_pages = max(1, (len(results) + PER_PAGE - 1)//PER_PAGE)
-        page = max(1, min(page, total_pages))
-        start = (page-1)*PER_PAGE
-        end = start + PER_PAGE
-        page_items = results[start:end]
-
-        header = (
-            f"📋 *Jami topilgan talabalar soni:* {total} ta\n"
-            f"🟢 *my.mehnat.uz da mehnat shartnomasiga ega talabalar soni:* {active} ta ({pct}%)\n"
-            f"📄 *Sahifa:* {page}/{total_pages}\n\n"
-        )
-        new_text = header + format_results_block(page_items)
-
-        await cq.edit_message_text(text=new_text, parse_mode="Markdown", reply_markup=pagination_keyboard(page, total_pages))
-        context.user_data["page"] = page
+        await send_page(chat_id, context, page, edit_message_id=cq.message.message_id)
         await log_user_action(chat_id, f"page_{page}")
     except Exception as e:
         logger.error(f"Sahifa o‘zgartirishda xato: {e}")
         await send_error_message(chat_id, context, f"❌ Sahifa o‘zgartirishda xato: {str(e)}")
 
+# ---------------- Inline rejim (@bot so'rov) ----------------
+def build_search_keys(rows):
+    """Har qator uchun qidiruv kaliti: fio, HEMIS ID, JSHSHIR va HEMIS UID (kichik harfda)."""
+    keys = [""]
+    for r in rows[1:]:
+        keys.append("\x00".join((
+            safe_cell(r, IDX_FIO), safe_cell(r, IDX_HEMIS), safe_cell(r, IDX_JSH), safe_cell(r, HEMIS_UID)
+        )).lower())
+    return keys
+
+async def _inline_match_ids(rows, version: int, q: str):
+    """So'rovga mos qator indekslari; eng uzun keshlangan prefiks natijasidan filtrlanadi."""
+    hit = _inline_cache.get((version, q))
+    if hit is not None:
+        return hit
+    keys = await derived_async("search_keys", rows, build_search_keys)
+    candidates = None
+    for n in range(len(q) - 1, INLINE_MIN_QUERY - 1, -1):
+        candidates = _inline_cache.get((version, q[:n]))
+        if candidates is not None:
+            break
+    if candidates is None:
+        candidates = range(1, len(keys))
+    ids = array("i", (i for i in candidates if q in keys[i]))
+    if len(ids) <= INLINE_CACHE_MAX_IDS:
+        _inline_cache[(version, q)] = ids
+    return ids
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    iq = update.inline_query
+    if not iq:
+        return
+    q = (iq.query or "").strip().lower()
+
+    # Shu foydalanuvchining avvalgi (eskirgan) so'rovini bekor qilamiz
+    prev = context.user_data.get("inline_task")
+    if prev is not None and prev is not asyncio.current_task() and not prev.done():
+        prev.cancel()
+    context.user_data["inline_task"] = asyncio.current_task()
+
+    try:
+        if len(q) < INLINE_MIN_QUERY:
+            await iq.answer([], cache_time=INLINE_CACHE_TIME)
+            return
+
+        await asyncio.sleep(INLINE_DEBOUNCE)
+
+        rows = await load_rows()
+        ids = await _inline_match_ids(rows, rows_version(), q)
+
+        offset = int(iq.offset) if (iq.offset or "").isdigit() else 0
+        page_ids = ids[offset:offset + INLINE_LIMIT]
+        next_offset = str(offset + INLINE_LIMIT) if offset + INLINE_LIMIT < len(ids) else ""
+
+        results = []
+        for i in page_ids:
+            item = row_to_item(rows[i])
+            icon = "🟢" if REQUIRED_STATUS.lower() in (item["status"] or "").lower() else "🔴"
+            results.append(InlineQueryResultArticle(
+                id=f"{i}",
+                title=item["fio"] or item["hemisuid"] or "Nomaʼlum",
+                description=f"{icon} {item['guruh']} | HEMIS ID: {item['hemis']}",
+                input_message_content=InputTextMessageContent(format_card(item), parse_mode="Markdown"),
+            ))
+
+        await iq.answer(results, cache_time=INLINE_CACHE_TIME, next_offset=next_offset)
+    except asyncio.CancelledError:
+        # Foydalanuvchi yozishda davom etdi — bu so'rov endi kerak emas
+        return
+    except Exception as e:
+        logger.error(f"Inline so'rovda xato: {e}")
+    finally:
+        if context.user_data.get("inline_task") is asyncio.current_task():
+            context.user_data["inline_task"] = None
+
+# ---------------- Facet bo'yicha filtrlash (/filtr) ----------------
+def _facet_selection_ids(index, selection):
+    return index.select([(FACETS[level][0], code) for level, code in enumerate(selection)])
+
+def _facet_breadcrumb(index, selection) -> str:
+    return " → ".join(index.values[FACETS[level][0]][code] for level, code in enumerate(selection))
+
+def _facet_view(index, selection, page: int = 1):
+    """Joriy tanlov uchun matn va klaviatura."""
+    ids = _facet_selection_ids(index, selection)
+    total = len(ids)
+    active = index.active_count(ids)
+    pct = round((active / total * 100), 2) if total else 0.0
+
+    lines = ["🧭 *Filtrlash*\n"]
+    for level, code in enumerate(selection):
+        key, _, title = FACETS[level]
+        lines.append(f"{title}: `{escape_md(index.values[key][code])}`")
+    lines.append(f"\n👥 *Tanlangan talabalar:* {total} ta")
+    lines.append(f"🟢 *Faol shartnomaga ega:* {active} ta ({pct}%)")
+
+    options = []
+    if len(selection) < len(FACETS):
+        key, _, title = FACETS[len(selection)]
+        counts = index.counts(key, ids)
+        options = [(f"{v} ({int(c)})", code) for code, (v, c) in enumerate(zip(index.values[key], counts)) if c]
+        lines.append(f"\n👇 {title} tanlang:")
+
+    controls = [("✅ Natijalar", "fc|r"), ("📤 Excel", "fc|x")]
+    if selection:
+        controls.insert(0, ("⬆️ Orqaga", "fc|b"))
+    return "\n".join(lines), facet_keyboard(options, page, controls)
+
+async def facet_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+    try:
+        rows = await load_rows()
+        if len(rows) <= 1:
+            await send_error_message(chat_id, context, "❌ *Jadval bo‘sh.*")
+            return
+        index = await derived_async("facets", rows, build_facet_index)
+        context.user_data.update({"facet_sel": [], "facet_version": rows_version()})
+        text, markup = _facet_view(index, [])
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text(text, parse_mode="Markdown", reply_markup=markup))
+        await log_user_action(chat_id, "filtr")
+    except Exception as e:
+        logger.error(f"Filtrlashda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Filtrlashda xato: {str(e)}")
+
+async def facet_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    cq = update.callback_query
+    if not cq:
+        logger.warning("Callback query topilmadi.")
+        return
+    await cq.answer()
+    chat_id = cq.message.chat.id
+    data = cq.data  # format: "fc|s|<kod>", "fc|p|<sahifa>", "fc|b", "fc|r", "fc|x"
+
+    try:
+        rows = await load_rows()
+        index = await derived_async("facets", rows, build_facet_index)
+        selection = list(context.user_data.get("facet_sel") or [])
+
+        # Jadval yangilangan bo'lsa, eski kodlar yaroqsiz — tanlovni qaytadan boshlaymiz
+        if context.user_data.get("facet_version") != rows_version():
+            context.user_data.update({"facet_sel": [], "facet_version": rows_version()})
+            text, markup = _facet_view(index, [])
+            await OUTBOX.submit(chat_id, lambda: cq.edit_message_text("♻️ Ma'lumotlar yangilandi, filtr qaytadan boshlandi.\n\n" + text, parse_mode="Markdown", reply_markup=markup))
+            return
+
+        parts = data.split("|")
+        action = parts[1]
+        page = 1
+
+        if action == "s" and len(selection) < len(FACETS):
+            code = int(parts[2])
+            if not 0 <= code < len(index.values[FACETS[len(selection)][0]]):
+                raise ValueError(f"Noto‘g‘ri kod: {code}")
+            selection.append(code)
+        elif action == "p":
+            page = int(parts[2])
+        elif action == "b":
+            selection = selection[:-1]
+        elif action in ("r", "x"):
+            ids = _facet_selection_ids(index, selection)
+            if not len(ids):
+                await send_error_message(chat_id, context, "❌ *Hech qanday ma'lumot topilmadi.*")
+                return
+            results = [row_to_item(rows[i + 1]) for i in ids.tolist()]
+            label = _facet_breadcrumb(index, selection) or "Barchasi"
+            if action == "x":
+                await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_DOCUMENT)
+                await export_to_excel(results, chat_id, context)
+                await log_user_action(chat_id, f"filtr_export_{label}")
+            else:
+                context.user_data.update({"query": label, "results": results, "page_msg_id": None, "page": 1})
+                await send_page(chat_id, context, page=1)
+                await log_user_action(chat_id, f"filtr_{label}")
+            return
+        else:
+            logger.warning(f"Noto‘g‘ri callback data: {data}")
+            return
+
+        context.user_data["facet_sel"] = selection
+        text, markup = _facet_view(index, selection, page)
+        await OUTBOX.submit(chat_id, lambda: cq.edit_message_text(text, parse_mode="Markdown", reply_markup=markup))
+    except Exception as e:
+        logger.error(f"Filtrlashda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Filtrlashda xato: {str(e)}")
+
 # ---------------- Grafik (Grafik tugmasi yoki /grafik) ----------------
-async def grafik(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    import matplotlib
-    matplotlib.use('Agg')  # Headless mode
-    import matplotlib.pyplot as plt
-    from io import BytesIO
-    from collections import Counter
-    from sheets import load_rows
-    from utils import safe_cell
+def render_chart(rows):
+    """
+    W ustuni bo'yicha taqsimot grafigini PNG (bytes) ko'rinishida qaytaradi; ma'lumot bo'lmasa None.
+    pyplot ishlatilmaydi: Figure obyekti jarayon bo'yicha umumiy holatga tegmaydi, shuning uchun
+    funksiya bir vaqtda bir nechta oqimda (asyncio.to_thread) xavfsiz chaqiriladi.
+    """
+    matplotlib = lazy_import("matplotlib")  # matplotlib faqat birinchi grafikda yuklanadi
+    Figure = lazy_import("matplotlib.figure").Figure
+
+    vals = [safe_cell(r, IDX_W) for r in rows[1:] if safe_cell(r, IDX_W)]
+    if not vals:
+        return None
+
+    counts = Counter(vals).most_common()
+    labels = [str(t[0]) for t in counts]
+    data = [t[1] for t in counts]
+
+    # Fontni Liberation Sans ga o‘zgartirish
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    
+    # Grafik o'lchamlari
+    fig_width = max(10, min(16, len(labels) * 0.8))
+    fig_height = max(6, len(labels) * 0.4)
+    
+    fig = Figure(figsize=(fig_width, fig_height), dpi=100)
+    ax = fig.add_subplot()
+    
+    # Horizontal bar chart
+    colors = matplotlib.colormaps["Set3"](range(len(labels)))
+    bars = ax.barh(range(len(labels)), data, color=colors, alpha=0.8, edgecolor='black', linewidth=0.5)
+
+    # Labels va formatting
+    ax.set_yticks(range(len(labels)), labels, fontsize=10)
+    ax.set_xlabel("Talabalar soni", fontsize=11, fontweight='bold')
+    ax.set_title("Yo'nalishlar bo'yicha taqsimot", fontsize=13, fontweight='bold', pad=15)  # Emoji olib tashlandi
+    ax.grid(axis="x", linestyle="--", alpha=0.5)
+
+    # Values on bars
+    max_val = max(data) if data else 1
+    for bar, val in zip(bars, data):
+        ax.text(bar.get_width() + max_val * 0.01, 
+                bar.get_y() + bar.get_height()/2,
+                str(val), ha="left", va="center", fontsize=9, fontweight="bold")
+
+    fig.tight_layout()
+    
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", facecolor='white', dpi=100)
+    return buffer.getvalue()
 
+async def grafik(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     
     try:
         await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_PHOTO)
 
         rows = await load_rows()  # Asinxron chaqiruv
-        vals = [safe_cell(r, IDX_W) for r in rows[1:] if safe_cell(r, IDX_W)]
-        
-        if not vals:
+        png = await asyncio.to_thread(render_chart, rows)
+        if png is None:
             await send_error_message(chat_id, context, "❌ Grafik uchun ma'lumot topilmadi.")
             return
-
-        counts = Counter(vals).most_common()
-        labels = [str(t[0]) for t in counts]
-        data = [t[1] for t in counts]
-
-        # Fontni Liberation Sans ga o‘zgartirish
-        plt.rcParams['axes.unicode_minus'] = False
-        
-        # Grafik o'lchamlari
-        fig_width = max(10, min(16, len(labels) * 0.8))
-        fig_height = max(6, len(labels) * 0.4)
-        
-        plt.figure(figsize=(fig_width, fig_height), dpi=100)
-        
-        # Horizontal bar chart
-        colors = plt.cm.Set3(range(len(labels)))
-        bars = plt.barh(range(len(labels)), data, color=colors, alpha=0.8, edgecolor='black', linewidth=0.5)
-
-        # Labels va formatting
-        plt.yticks(range(len(labels)), labels, fontsize=10)
-        plt.xlabel("Talabalar soni", fontsize=11, fontweight='bold')
-        plt.title("Yo'nalishlar bo'yicha taqsimot", fontsize=13, fontweight='bold', pad=15)  # Emoji olib tashlandi
-        plt.grid(axis="x", linestyle="--", alpha=0.5)
-
-        # Values on bars
-        max_val = max(data) if data else 1
-        for bar, val in zip(bars, data):
-            plt.text(bar.get_width() + max_val * 0.01, 
-                    bar.get_y() + bar.get_height()/2,
-                    str(val), ha="left", va="center", fontsize=9, fontweight="bold")
-
-        plt.tight_layout()
-        
-        # BytesIO orqali grafikni yuborish
-        buffer = BytesIO()
-        plt.savefig(buffer, format="png", bbox_inches="tight", facecolor='white', dpi=100)
-        plt.close()
-        buffer.seek(0)
         
-        await context.bot.send_photo(
+        await OUTBOX.submit(chat_id, lambda: context.bot.send_photo(
             chat_id=chat_id, 
-            photo=buffer, 
+            photo=png, 
             caption="📊 Yo'nalishlar kesimi bo'yicha taqsimot grafigi",
             reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔀 To'liq ma'lumot", url='https://t.me/shohabbosdev')]])
-        )
+        ))
         await log_user_action(chat_id, "grafik")
     except Exception as e:
         logger.error(f"Grafik yaratishda xato: {e}")
@@ -344,12 +533,12 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     try:
-        await update.message.reply_text(
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text(
             "🛠 *Admin paneli*\n\n"
             "Quyidagi amallarni tanlang:",
             parse_mode="Markdown",
             reply_markup=reply_markup
-        )
+        ))
         await log_user_action(chat_id, "admin_panel")
     except Exception as e:
         logger.error(f"Admin panelini ochishda xato: {e}")
@@ -376,18 +565,23 @@ async def admin_inline_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             stats = await get_user_stats()
             if not stats:
                 logger.info("Statistika mavjud emas.")
-                await cq.edit_message_text(
+                await OUTBOX.submit(chat_id, lambda: cq.edit_message_text(
                     text="❌ Hozircha statistika mavjud emas.",
                     parse_mode="Markdown"
-                )
+                ))
                 return
 
-            lines = ["📊 *Bot statistikasi*\n"]
+            q = OUTBOX.stats()
+            lines = [
+                "📊 *Bot statistikasi*\n",
+                f"📮 *Chiquvchi navbat:* interaktiv {q['interaktiv']} | ommaviy {q['ommaviy']} | yuborilmoqda {q['yuborilmoqda']}",
+                f"   yuborildi {q['yuborildi']} | qayta urinish {q['qayta_urinish']} | xato {q['xato']}\n",
+            ]
             for action, count in stats.items():
                 lines.append(f"✅ *{escape_md(action)}*: {count} marta")
             text = "\n".join(lines)
 
-            await cq.edit_message_text(text=text, parse_mode="Markdown")
+            await OUTBOX.submit(chat_id, lambda: cq.edit_message_text(text=text, parse_mode="Markdown"))
             await log_user_action(chat_id, "admin_stats")
         except Exception as e:
             logger.error(f"Admin statistikada xato: {e}")
@@ -395,12 +589,12 @@ async def admin_inline_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
     elif data == "admin_edit_row":
         try:
-            await cq.edit_message_text(
+            await OUTBOX.submit(chat_id, lambda: cq.edit_message_text(
                 "📝 Tahrir qilmoqchi bo‘lgan qator indeksini va yangi ma'lumotlarni kiriting.\n"
                 "Format: `row_index|hemisuid|fio|hemis|jshshir|status|lavozim|tashkilot|sanasi`\n"
                 "Masalan: `2|12345|Aliyev Ali|67890|12345678901234|Faol|Muhandis|ABC kompaniyasi|2023-10-01`",
                 parse_mode="Markdown"
-            )
+            ))
             context.user_data["admin_action"] = "edit_row"
             await log_user_action(chat_id, "admin_edit_row")
         except Exception as e:
@@ -409,7 +603,7 @@ async def admin_inline_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
     elif data == "admin_exit":
         try:
-            await cq.edit_message_text("🛠 Admin panelidan chiqildi.")
+            await OUTBOX.submit(chat_id, lambda: cq.edit_message_text("🛠 Admin panelidan chiqildi."))
             await log_user_action(chat_id, "admin_exit")
         except Exception as e:
             logger.error(f"Admin panelidan chiqishda xato: {e}")
@@ -441,7 +635,7 @@ async def admin_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
         values = parts[1:]
 
         await update_sheet_row(row_index, values)
-        await update.message.reply_text(f"✅ Qator {row_index} muvaffaqiyatli yangilandi.")
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text(f"✅ Qator {row_index} muvaffaqiyatli yangilandi."))
         context.user_data["admin_action"] = None
         await log_user_action(chat_id, f"edit_row_{row_index}")
     except ValueError:
@@ -4,7 +4,7 @@ def reply_main_menu():
     """Asosiy menyuni qaytaradi."""
     keyboard = [
         [KeyboardButton("🔎 Qidiruv"), KeyboardButton("📊 Statistika")],
-        [KeyboardButton("📉 Grafik")],
+        [KeyboardButton("📉 Grafik"), KeyboardButton("🧭 Filtr")],
     ]
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True, one_time_keyboard=False)
 
@@ -18,24 +18,25 @@ def pagination_keyboard(page: int, total_pages: int):
     buttons.append(InlineKeyboardButton("📤 Excel'ga eksport", callback_data="export_excel"))
     return InlineKeyboardMarkup([buttons])
 
-def direction_keyboard(directions, page: int, per_page: int = 10):
-    """W qiymatlari uchun inline tugmalar sahifalab."""
-    total_pages = max(1, (len(directions) + per_page - 1) // per_page)
+def facet_keyboard(options, page: int, controls, per_page: int = 10):
+    """Facet qiymatlari uchun inline tugmalar sahifalab. options: (matn, kod) juftliklari."""
+    total_pages = max(1, (len(options) + per_page - 1) // per_page)
     page = max(1, min(page, total_pages))
     start = (page - 1) * per_page
     end = start + per_page
-    page_directions = directions[start:end]
+    page_options = options[start:end]
 
     buttons = []
-    for dir in page_directions:
-        buttons.append([InlineKeyboardButton(dir, callback_data=f"dir_{dir}")])
+    for label, code in page_options:
+        buttons.append([InlineKeyboardButton(label, callback_data=f"fc|s|{code}")])
 
     pagination = []
     if page > 1:
-        pagination.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"dir_pg|{page-1}"))
+        pagination.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"fc|p|{page-1}"))
     if page < total_pages:
-        pagination.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"dir_pg|{page+1}"))
+        pagination.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"fc|p|{page+1}"))
     if pagination:
         buttons.append(pagination)
 
-    return InlineKeyboardMarkup(buttons)
\ No newline at end of file
+    buttons.append([InlineKeyboardButton(text, callback_data=data) for text, data in controls])
+    return InlineKeyboardMarkup(buttons)
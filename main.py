@@ -1,15 +1,24 @@
+import startup  # Birinchi import: ishga tushish vaqtini o'lchash shu yerdan boshlanadi
 import logging
 from environs import Env
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    CallbackQueryHandler,
-    filters,
-)
 
-from handlers import start, stat, search, grafik, inline_pagination_handler, admin_panel, admin_inline_handler, admin_edit
-from config import BOT_TOKEN
+with startup.timed("import telegram"):
+    from telegram.ext import (
+        Application,
+        CommandHandler,
+        MessageHandler,
+        CallbackQueryHandler,
+        InlineQueryHandler,
+        filters,
+    )
+
+with startup.timed("import handlers"):
+    from handlers import start, stat, search, grafik, inline_pagination_handler, admin_panel, admin_inline_handler, admin_edit, inline_query, facet_start, facet_handler
+    from reports import subscribe, unsubscribe, report_now, register_report_jobs
+    from watch import watch_add, watch_list, watch_remove, register_refresh_job
+    from bulk import bulk_text, bulk_file
+from sender import OUTBOX
+from config import BOT_TOKEN, PREWARM, PREWARM_DELAY
 
 # Loglashni sozlash
 logging.basicConfig(
@@ -22,17 +31,30 @@ async def error_handler(update, context):
     """Xatolarni loglash va foydalanuvchiga xabar yuborish."""
     logger.error(f"Xato yuz berdi: {context.error}")
     try:
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
+        chat_id = update.effective_chat.id
+        await OUTBOX.submit(chat_id, lambda: context.bot.send_message(
+            chat_id=chat_id,
             text="❌ Botda xato yuz berdi. Iltimos, qaytadan urinib ko‘ring."
-        )
+        ))
     except Exception:
         pass
 
+async def post_init(app: Application):
+    """Polling boshlanishidan oldin: ishga tushish hisobotini loglash va fon yuklashni rejalashtirish."""
+    logger.info(startup.startup_report())
+    OUTBOX.start()
+    if PREWARM:
+        startup.schedule_prewarm(PREWARM_DELAY)
+
+async def post_shutdown(app: Application):
+    await OUTBOX.stop()
+
 def main():
     app = (
         Application.builder()
         .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
@@ -40,15 +62,33 @@ def main():
     app.add_handler(CommandHandler("stat", stat))
     app.add_handler(CommandHandler("grafik", grafik))
     app.add_handler(CommandHandler("admin", admin_panel))
+    app.add_handler(CommandHandler("filtr", facet_start))
+    app.add_handler(CommandHandler("obuna", subscribe))
+    app.add_handler(CommandHandler("obuna_bekor", unsubscribe))
+    app.add_handler(CommandHandler("hisobot", report_now))
+    app.add_handler(CommandHandler("kuzat", watch_add))
+    app.add_handler(CommandHandler("kuzatuvlar", watch_list))
+    app.add_handler(CommandHandler("kuzat_bekor", watch_remove))
+    # Ko'p qatorli xabar yoki CSV/XLSX fayl — ommaviy qidiruv (oddiy qidiruvdan oldin tekshiriladi)
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(r"\S\s*\n\s*\S"), bulk_text))
+    app.add_handler(MessageHandler(filters.Document.FileExtension("csv") | filters.Document.FileExtension("xlsx"), bulk_file))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, search))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, admin_edit))
-    app.add_handler(CallbackQueryHandler(inline_pagination_handler, pattern="pg|.*|export_excel"))
+    app.add_handler(CallbackQueryHandler(inline_pagination_handler, pattern=r"^(pg\|\d+|export_excel)$"))
+    app.add_handler(CallbackQueryHandler(facet_handler, pattern=r"^fc\|"))
     app.add_handler(CallbackQueryHandler(admin_inline_handler, pattern="admin_.*"))
+    # block=False: har bir so'rov alohida vazifada, eskirgan so'rovlarni bekor qilish mumkin bo'ladi
+    app.add_handler(InlineQueryHandler(inline_query, block=False))
+
+    # Rejalashtirilgan hisobotlar
+    register_report_jobs(app)
+    # Jadvalni fonda yangilash va holat o'zgarishlarini kuzatish
+    register_refresh_job(app)
 
     # Xato handleri qo‘shish
     app.add_error_handler(error_handler)
 
-    app.run_polling(allowed_updates=["message", "callback_query"])
+    app.run_polling(allowed_updates=["message", "callback_query", "inline_query"])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
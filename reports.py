@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+from telegram import Update
+from telegram.constants import ChatAction
+from telegram.ext import Application, ContextTypes
+from config import ADMIN_IDS, REPORT_TIME, REPORT_WEEKDAY, REPORT_TZ, REPORTS_DIR, REPORTS_KEEP
+from sheets import load_rows, rows_version
+from handlers import build_stat_text, render_chart, row_to_item
+from sender import OUTBOX, BULK, INTERACTIVE
+from utils import build_excel, split_text, send_error_message, log_user_action
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_FILE = "subscriptions.json"
+REPORT_FILE_SUFFIXES = ("_stat.txt", "_grafik.png", "_hisobot.xlsx")
+
+# Obuna turi -> hisobot sarlavhasi
+REPORT_KINDS = {
+    "kunlik": "🗓 *Kunlik hisobot*",
+    "haftalik": "📆 *Haftalik hisobot*",
+}
+
+# Oxirgi hisobot: har bir ma'lumot versiyasi uchun bir marta yaratiladi
+_report = {}
+_report_lock = asyncio.Lock()
+
+# ---------------- Obunalar ----------------
+def _load_subscriptions():
+    try:
+        with open(SUBSCRIPTIONS_FILE, "r") as f:
+            data = json.load(f)
+        return {kind: list(data.get(kind, [])) for kind in REPORT_KINDS}
+    except FileNotFoundError:
+        return {kind: [] for kind in REPORT_KINDS}
+    except Exception as e:
+        logger.error(f"Obunalarni o‘qishda xato: {e}")
+        return {kind: [] for kind in REPORT_KINDS}
+
+def _save_subscriptions(subs):
+    with open(SUBSCRIPTIONS_FILE, "w") as f:
+        json.dump(subs, f)
+
+# ---------------- Hisobot yaratish ----------------
+def _prune_report_files():
+    """REPORTS_DIR da faqat oxirgi REPORTS_KEEP ta hisobot qoladi (Excel fayllarda JSHSHIR bor)."""
+    names = [n for n in os.listdir(REPORTS_DIR) if n.endswith(REPORT_FILE_SUFFIXES)]
+    stamps = sorted({n.rsplit("_", 1)[0] for n in names}, reverse=True)
+    stale = set(stamps[max(REPORTS_KEEP, 1):])
+    for name in names:
+        if name.rsplit("_", 1)[0] in stale:
+            os.remove(os.path.join(REPORTS_DIR, name))
+
+def _save_report_files(report):
+    """Hisobot fayllarini REPORTS_DIR ga yozadi va eskilarini o'chiradi."""
+    try:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        stamp = report["created"].strftime("%Y-%m-%d_%H%M")
+        with open(os.path.join(REPORTS_DIR, f"{stamp}_stat.txt"), "w", encoding="utf-8") as f:
+            f.write(report["stat"])
+        if report["chart"]:
+            with open(os.path.join(REPORTS_DIR, f"{stamp}_grafik.png"), "wb") as f:
+                f.write(report["chart"])
+        with open(os.path.join(REPORTS_DIR, f"{stamp}_hisobot.xlsx"), "wb") as f:
+            f.write(report["excel"])
+        _prune_report_files()
+    except Exception as e:
+        logger.error(f"Hisobot fayllarini saqlashda xato: {e}")
+
+async def get_report():
+    """Joriy ma'lumot versiyasi uchun hisobot (statistika matni, grafik PNG, Excel)."""
+    async with _report_lock:
+        rows = await load_rows()
+        version = rows_version()
+        if _report.get("version") == version:
+            return _report
+
+        logger.info(f"Hisobot yaratilmoqda (versiya {version}).")
+        stat = await build_stat_text(rows)
+        chart = await asyncio.to_thread(render_chart, rows)
+        excel = await asyncio.to_thread(build_excel, [row_to_item(r) for r in rows[1:]])
+
+        _report.clear()
+        _report.update({
+            "version": version,
+            "created": datetime.now(ZoneInfo(REPORT_TZ)),
+            "stat": stat,
+            "chart": chart,
+            "excel": excel.getvalue(),
+            "file_ids": {},  # Birinchi yuklashdan keyin Telegram file_id qayta ishlatiladi
+        })
+        await asyncio.to_thread(_save_report_files, _report)
+        return _report
+
+# ---------------- Yuborish ----------------
+async def send_report(bot, chat_id, title: str, priority: int = BULK):
+    """Hisobotni bitta chatga chiquvchi navbat orqali yuboradi."""
+    report = await get_report()
+    file_ids = report["file_ids"]
+    stamp = report["created"].strftime("%Y-%m-%d %H:%M")
+
+    texts = [
+        OUTBOX.post(chat_id, lambda part=part: bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown", protect_content=True), priority)
+        for part in split_text(f"{title} ({stamp})\n\n{report['stat']}")
+    ]
+    await asyncio.gather(*texts)
+
+    if report["chart"]:
+        msg = await OUTBOX.submit(chat_id, lambda: bot.send_photo(
+            chat_id=chat_id,
+            photo=file_ids.get("chart") or report["chart"],
+            caption="📊 Yo'nalishlar kesimi bo'yicha taqsimot grafigi",
+        ), priority)
+        file_ids.setdefault("chart", msg.photo[-1].file_id)
+
+    msg = await OUTBOX.submit(chat_id, lambda: bot.send_document(
+        chat_id=chat_id,
+        document=file_ids.get("excel") or report["excel"],
+        filename=f"Hisobot-{report['created'].strftime('%Y_%m_%d_%H_%M')}.xlsx",
+        caption="📤 To'liq ma'lumotlar (Excel)",
+    ), priority)
+    file_ids.setdefault("excel", msg.document.file_id)
+
+async def _send_report_logged(bot, chat_id, title: str) -> bool:
+    try:
+        await send_report(bot, chat_id, title)
+        return True
+    except Exception as e:
+        logger.error(f"Hisobotni {chat_id} ga yuborishda xato: {e}")
+        return False
+
+async def broadcast_report(bot, kind: str):
+    """Obunachilarga hisobotni yuboradi; tezlik limitlarini chiquvchi navbat boshqaradi."""
+    chat_ids = _load_subscriptions().get(kind, [])
+    if not chat_ids:
+        return
+    title = REPORT_KINDS[kind]
+    # Birinchi chatga fayllar yuklanadi, qolganlariga file_id bilan parallel yuboriladi
+    ok = [await _send_report_logged(bot, chat_ids[0], title)]
+    ok += await asyncio.gather(*(_send_report_logged(bot, chat_id, title) for chat_id in chat_ids[1:]))
+    logger.info(f"{kind} hisobot yuborildi: {sum(ok)}/{len(chat_ids)} chat.")
+
+async def report_job(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue orqali rejalashtirilgan hisobot."""
+    try:
+        await broadcast_report(context.bot, context.job.data)
+    except Exception as e:
+        logger.error(f"Rejalashtirilgan hisobotda xato: {e}")
+
+def register_report_jobs(app: Application):
+    """Kunlik va haftalik hisobot vazifalarini JobQueue'ga qo'shadi."""
+    if app.job_queue is None:
+        logger.warning("JobQueue mavjud emas (python-telegram-bot[job-queue] o‘rnatilmagan), hisobotlar rejalashtirilmadi.")
+        return
+    hour, minute = (int(x) for x in REPORT_TIME.split(":"))
+    at = dtime(hour=hour, minute=minute, tzinfo=ZoneInfo(REPORT_TZ))
+    app.job_queue.run_daily(report_job, time=at, data="kunlik", name="report_kunlik")
+    app.job_queue.run_daily(report_job, time=at, days=(REPORT_WEEKDAY,), data="haftalik", name="report_haftalik")
+
+# ---------------- Buyruqlar ----------------
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/obuna [kunlik|haftalik] — hisobotlarga obuna bo'lish."""
+    chat_id = update.effective_chat.id
+    if chat_id not in ADMIN_IDS:
+        await send_error_message(chat_id, context, "❌ Sizda admin paneliga kirish huquqi yo‘q.")
+        return
+
+    kind = (context.args[0].lower() if context.args else "kunlik")
+    if kind not in REPORT_KINDS:
+        await send_error_message(chat_id, context, "❌ Format: `/obuna kunlik` yoki `/obuna haftalik`")
+        return
+
+    try:
+        subs = _load_subscriptions()
+        if chat_id not in subs[kind]:
+            subs[kind].append(chat_id)
+            _save_subscriptions(subs)
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text(f"✅ {kind.capitalize()} hisobotga obuna bo‘ldingiz ({REPORT_TIME})."))
+        await log_user_action(chat_id, f"obuna_{kind}")
+    except Exception as e:
+        logger.error(f"Obunada xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Obunada xato: {str(e)}")
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/obuna_bekor [kunlik|haftalik] — obunani bekor qilish (turi ko'rsatilmasa, barchasi)."""
+    chat_id = update.effective_chat.id
+    kinds = [context.args[0].lower()] if context.args else list(REPORT_KINDS)
+    if not set(kinds) <= REPORT_KINDS.keys():
+        await send_error_message(chat_id, context, "❌ Format: `/obuna_bekor kunlik` yoki `/obuna_bekor haftalik`")
+        return
+    try:
+        subs = _load_subscriptions()
+        removed = 0
+        for kind in kinds:
+            if chat_id in subs[kind]:
+                subs[kind].remove(chat_id)
+                removed += 1
+        if not removed:
+            await send_error_message(chat_id, context, "❌ *Hech qanday ma'lumot topilmadi.*")
+            return
+        _save_subscriptions(subs)
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text("✅ Hisobot obunasi bekor qilindi."))
+        await log_user_action(chat_id, "obuna_bekor")
+    except Exception as e:
+        logger.error(f"Obunani bekor qilishda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Obunani bekor qilishda xato: {str(e)}")
+
+async def report_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/hisobot — joriy versiya hisobotini darhol yuborish (keshdan, qayta hisoblamasdan)."""
+    chat_id = update.effective_chat.id
+    if chat_id not in ADMIN_IDS:
+        await send_error_message(chat_id, context, "❌ Sizda admin paneliga kirish huquqi yo‘q.")
+        return
+    try:
+        await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_DOCUMENT)
+        await send_report(context.bot, chat_id, "📑 *Hisobot*", priority=INTERACTIVE)
+        await log_user_action(chat_id, "hisobot")
+    except Exception as e:
+        logger.error(f"Hisobot yuborishda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Hisobot yuborishda xato: {str(e)}")
@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import logging
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram limitlari: bot bo'yicha ~30 xabar/soniya, bitta chatga ~1 xabar/soniya,
+# guruhlarga ~20 xabar/daqiqa. Qisqa portlashlar (burst) uchun kichik zaxira qoldiramiz.
+GLOBAL_RATE = 28.0
+GLOBAL_BURST = 28
+PRIVATE_RATE = 1.0
+GROUP_RATE = 20 / 60
+CHAT_BURST = 3
+
+MAX_ATTEMPTS = 4           # RetryAfter bo'lsa qayta urinishlar soni
+BULK_PAUSE_MAX = 2.0       # RetryAfter dan keyin ommaviy yuborishni to'xtatib turish chegarasi (soniya)
+DEPTH_WARNING = 200        # Navbat shundan uzun bo'lsa ogohlantirish
+
+# Ustuvorlik: kichik qiymat oldin yuboriladi
+INTERACTIVE = 0
+BULK = 1
+
+class _Bucket:
+    """Token bucket: rate token/soniya, capacity — maksimal portlash."""
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Keyingi token uchun kutish vaqti (0 — hozir mumkin)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Keyingi token kamida seconds soniyadan keyin paydo bo'ladi."""
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class _Job:
+    __slots__ = ("chat_id", "send", "future", "attempts")
+
+    def __init__(self, chat_id, send, future):
+        self.chat_id = chat_id
+        self.send = send
+        self.future = future
+        self.attempts = 0
+
+class OutboundQueue:
+    """
+    Telegram'ga chiquvchi so'rovlar uchun markaziy navbat.
+    Global va har bir chat bo'yicha tezlikni cheklaydi, RetryAfter (flood-control) da
+    ko'rsatilgan vaqt kutib qayta yuboradi, interaktiv javoblarni ommaviy yuborishdan oldin o'tkazadi.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._worker = None
+        self._seq = itertools.count()
+        self._global = None
+        self._chats = {}
+        self._locks = {}
+        self._bulk_paused_until = 0.0
+        self._pending = {INTERACTIVE: 0, BULK: 0}
+        self._in_flight = 0
+        self._futures = set()  # Hali yakunlanmagan so'rovlar
+        self._tasks = set()    # Yuborilayotgan so'rovlar vazifalari (GC yig'ib olmasligi uchun kuchli havola)
+        self._timers = {}      # seq -> chat limiti tufayli kechiktirilgan so'rov taymeri
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Ishchi vazifani joriy event loop'da ishga tushiradi (navbat va undagi so'rovlar saqlanadi)."""
+        if self._worker is not None and not self._worker.done():
+            return
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._global = _Bucket(GLOBAL_RATE, GLOBAL_BURST, loop.time())
+        self._worker = loop.create_task(self._run())
+
+    async def stop(self):
+        """Ishchini to'xtatadi; yuborilmagan so'rovlar kutayotganlar uchun xato bilan yakunlanadi."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        self._pending = {INTERACTIVE: 0, BULK: 0}
+        for future in list(self._futures):
+            if not future.done():
+                future.set_exception(RuntimeError("Chiquvchi navbat to‘xtatildi"))
+
+    def post(self, chat_id, send, priority: int = INTERACTIVE) -> asyncio.Future:
+        """send — argumentsiz korutina funksiyasi. Natija Future orqali qaytadi (kutish shart emas)."""
+        if self._worker is None or self._worker.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        self._put(priority, next(self._seq), _Job(chat_id, send, future))
+        depth = self.depth()
+        if depth >= DEPTH_WARNING and depth % DEPTH_WARNING == 0:
+            logger.warning(f"Chiquvchi navbat uzaymoqda: {self.stats()}")
+        return future
+
+    async def submit(self, chat_id, send, priority: int = INTERACTIVE):
+        """Navbatga qo'yadi va Telegram javobini (masalan, Message) qaytaradi."""
+        return await self.post(chat_id, send, priority)
+
+    def depth(self) -> int:
+        return self._pending[INTERACTIVE] + self._pending[BULK]
+
+    def stats(self) -> dict:
+        return {
+            "interaktiv": self._pending[INTERACTIVE],
+            "ommaviy": self._pending[BULK],
+            "yuborilmoqda": self._in_flight,
+            "yuborildi": self.sent,
+            "qayta_urinish": self.retried,
+            "xato": self.failed,
+        }
+
+    # ---------------- Ichki ----------------
+    def _put(self, priority, seq, job):
+        self._pending[priority] += 1
+        self._queue.put_nowait((priority, seq, job))
+
+    def _requeue(self, priority, seq, job):
+        self._timers.pop(seq, None)
+        if job.future.done():  # Kutish paytida bekor qilingan yoki navbat to'xtatilgan
+            self._pending[priority] -= 1
+            return
+        self._queue.put_nowait((priority, seq, job))
+
+    def _chat_bucket(self, chat_id, now: float) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = PRIVATE_RATE if isinstance(chat_id, int) and chat_id > 0 else GROUP_RATE
+            bucket = self._chats[chat_id] = _Bucket(rate, CHAT_BURST, now)
+        return bucket
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, seq, job = await self._queue.get()
+            self._pending[priority] -= 1
+            if job.future.done():  # Chaqiruvchi bekor qilgan
+                continue
+
+            now = loop.time()
+            # Chat limiti to'lgan (yoki flood-control'da) bo'lsa, boshqa chatlarni to'sib qo'ymaslik uchun keyinroq qaytaramiz
+            wait = self._chat_bucket(job.chat_id, now).delay(now)
+            if priority == BULK:
+                wait = max(wait, self._bulk_paused_until - now)
+            if wait > 0:
+                self._pending[priority] += 1
+                self._timers[seq] = loop.call_later(wait, self._requeue, priority, seq, job)
+                continue
+
+            wait = self._global.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._global.delay(loop.time())
+            self._global.take()
+            self._chats[job.chat_id].take()
+
+            self._in_flight += 1
+            task = loop.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job):
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(job.chat_id, asyncio.Lock())
+        try:
+            # Qayta urinish chat qulfi ichida: shu chatning keyingi xabarlari o'zib ketmaydi
+            async with lock:
+                while True:
+                    try:
+                        result = await job.send()
+                        break
+                    except RetryAfter as e:
+                        self.retried += 1
+                        job.attempts += 1
+                        # Pauza faqat shu chatga; ommaviy yuborish esa qisqa muddatga sekinlashtiriladi
+                        now = loop.time()
+                        self._chat_bucket(job.chat_id, now).pause(e.retry_after)
+                        self._bulk_paused_until = max(self._bulk_paused_until, now + min(e.retry_after, BULK_PAUSE_MAX))
+                        logger.warning(f"Flood limit: {e.retry_after} soniya kutiladi (chat_id={job.chat_id}, urinish {job.attempts}).")
+                        if job.attempts >= MAX_ATTEMPTS:
+                            raise
+                        await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+
+# Bot bo'yicha yagona navbat
+OUTBOX = OutboundQueue()
+
+def _log_failure(future: asyncio.Future, what: str):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"{what}: {future.exception()}")
+
+def post_logged(chat_id, send, what: str, priority: int = INTERACTIVE) -> asyncio.Future:
+    """Natijasi kutilmaydigan so'rov: navbatga qo'yadi, xato bo'lsa loglaydi."""
+    future = OUTBOX.post(chat_id, send, priority)
+    future.add_done_callback(lambda f: _log_failure(f, what))
+    return future
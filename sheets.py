@@ -1,8 +1,8 @@
-import gspread_asyncio
-from google.oauth2.service_account import Credentials
 from config import SHEET_ID, WORKSHEET_TITLE
 from cachetools import TTLCache
-import time
+from startup import lazy_import, timed
+from columns import HEMIS_UID, IDX_HEMIS, IDX_FIO, IDX_STAT, IDX_JSH, IDX_W, IDX_LAVOZIM, IDX_TASHKILOT, IDX_SANASI
+import asyncio
 import os
 import json
 import base64
@@ -19,6 +19,7 @@ def get_credentials():
     """
     Environment variable'dan credentials'ni olish va Google Credentials obyektini yaratish
     """
+    Credentials = lazy_import("google.oauth2.service_account").Credentials
     try:
         # Environment variable'dan base64 encoded credentials'ni olish
         encoded_credentials = os.environ.get('GOOGLE_CREDENTIALS')
@@ -45,31 +46,93 @@ def get_credentials():
     except Exception as e:
         raise Exception(f"Credentials yuklashda xatolik: {str(e)}")
 
-# Credentials'ni olish
-CREDS = get_credentials()
-GC = gspread_asyncio.AsyncioGspreadClientManager(lambda: CREDS)
+# Credentials va klient birinchi Sheets murojaatida yaratiladi (import vaqtida emas)
+_creds = None
+_gc = None
+
+def _cached_credentials():
+    global _creds
+    if _creds is None:
+        with timed("credentials"):
+            _creds = get_credentials()
+    return _creds
+
+def get_gc():
+    """gspread_asyncio klient menejerini birinchi chaqiruvda yaratib qaytaradi."""
+    global _gc
+    if _gc is None:
+        gspread_asyncio = lazy_import("gspread_asyncio")
+        _gc = gspread_asyncio.AsyncioGspreadClientManager(_cached_credentials)
+    return _gc
+
+# Ma'lumot versiyasi: jadval har safar qayta o'qilganda oshadi
+_version = 0
+# Hosila indekslar: nom -> (rows obyekti, qiymat)
+_derived = {}
+# Qurilayotgan indekslar: nom -> (rows obyekti, vazifa)
+_building = {}
+
+def rows_version() -> int:
+    """Keshdagi jadval nusxasining versiyasi."""
+    return _version
+
+def derived(name: str, rows, builder):
+    """rows asosida qurilgan indeksni qaytaradi; har bir jadval nusxasi uchun bir marta quriladi."""
+    hit = _derived.get(name)
+    if hit is not None and hit[0] is rows:
+        return hit[1]
+    value = builder(rows)
+    _derived[name] = (rows, value)
+    return value
+
+async def derived_async(name: str, rows, builder):
+    """
+    derived() ning asinxron varianti: tayyor indeks darhol qaytadi, aks holda u alohida oqimda quriladi
+    (event loop to'xtamaydi). Bir vaqtdagi so'rovlar bitta qurilishni kutadi.
+    """
+    hit = _derived.get(name)
+    if hit is not None and hit[0] is rows:
+        return hit[1]
+    pending = _building.get(name)
+    if pending is None or pending[0] is not rows:
+        task = asyncio.ensure_future(asyncio.to_thread(derived, name, rows, builder))
+        pending = _building[name] = (rows, task)
+        task.add_done_callback(lambda t: _building.pop(name) if _building.get(name, (None, None))[1] is t else None)
+    # shield: kutayotgan handler bekor qilinsa ham qurilish boshqalar uchun davom etadi
+    return await asyncio.shield(pending[1])
 
 # Kerakli ustun indekslari
-REQUIRED_COLUMNS = [0, 2, 3, 5, 4, 22, 29, 30, 34]  # HEMIS_UID, IDX_HEMIS, IDX_FIO, IDX_JSH, IDX_STAT, IDX_W, IDX_LAVOZIM, IDX_TASHKILOT, IDX_SANASI
+REQUIRED_COLUMNS = [HEMIS_UID, IDX_HEMIS, IDX_FIO, IDX_JSH, IDX_STAT, IDX_W, IDX_LAVOZIM, IDX_TASHKILOT, IDX_SANASI]
 
-async def load_rows():
+# Oxirgi o'qilgan nusxa (kesh muddati tugasa ham saqlanadi)
+_last_rows = None
+
+async def load_rows(force: bool = False):
     """
     Varaqdagi faqat kerakli ustunlarni asinxron o'qiydi va keshlaydi.
-    0-qatorda header bo'ladi.
+    0-qatorda header bo'ladi. force=True bo'lsa kesh chetlab o'tiladi.
+    Ma'lumot o'zgarmagan bo'lsa avvalgi nusxa va versiya saqlanadi (indekslar qayta qurilmaydi).
     """
+    global _version, _last_rows
     cache_key = f"sheet_{SHEET_ID}_{WORKSHEET_TITLE}"
-    if cache_key in cache:
+    if not force and cache_key in cache:
         return cache[cache_key]
 
     try:
         # Asinxron klient yaratish
-        client = await GC.authorize()
+        client = await get_gc().authorize()
         spreadsheet = await client.open_by_key(SHEET_ID)
         worksheet = await spreadsheet.worksheet(WORKSHEET_TITLE)
 
         # Faqat kerakli ustunlarni o'qish
         rows = await worksheet.get(f"A1:AI{worksheet.row_count}")
 
+        if rows == _last_rows:
+            rows = _last_rows
+        else:
+            _last_rows = rows
+            _version += 1
+
         # Keshga saqlash
         cache[cache_key] = rows
         return rows
@@ -0,0 +1,75 @@
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Jarayon boshlangan vaqtga eng yaqin nuqta (main.py birinchi bo'lib shu modulni import qiladi)
+_STARTED_AT = time.perf_counter()
+
+# Bosqich nomi -> sarflangan vaqt (soniya)
+TIMINGS: Dict[str, float] = {}
+
+# Bot ishga tushgandan keyin fon rejimida yuklanadigan og'ir modullar
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "openpyxl",
+    "matplotlib.figure",
+    "gspread_asyncio",
+    "google.oauth2.service_account",
+]
+
+_prewarm_task = None
+
+@contextmanager
+def timed(name: str):
+    """Blok bajarilish vaqtini TIMINGS ga yozadi."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS[name] = TIMINGS.get(name, 0.0) + (time.perf_counter() - t0)
+
+def lazy_import(name: str):
+    """
+    Modulni birinchi murojaatda import qiladi va sarflangan vaqtni qayd etadi.
+    sys.modules'dan to'g'ridan-to'g'ri olinmaydi: fon oqimi import qilayotgan modul u yerda
+    yarim yuklangan holda turishi mumkin; import_module esa import tugashini kutadi.
+    """
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with timed(f"import {name}"):
+        module = importlib.import_module(name)
+    logger.info(f"Modul yuklandi: {name} ({TIMINGS[f'import {name}'] * 1000:.0f} ms)")
+    return module
+
+def prewarm():
+    """Og'ir modullarni oldindan yuklaydi (alohida oqimda chaqiriladi)."""
+    for name in HEAVY_MODULES:
+        try:
+            lazy_import(name)
+        except Exception as e:
+            logger.warning(f"Oldindan yuklashda xato ({name}): {e}")
+    logger.info("Og'ir modullar oldindan yuklandi.\n" + startup_report())
+
+async def _prewarm_later(delay: float):
+    await asyncio.sleep(delay)
+    await asyncio.to_thread(prewarm)
+
+def schedule_prewarm(delay: float = 5.0):
+    """Polling boshlangach, og'ir modullarni fon oqimida yuklashni rejalashtiradi."""
+    global _prewarm_task
+    if _prewarm_task is None:
+        _prewarm_task = asyncio.get_running_loop().create_task(_prewarm_later(delay))
+
+def startup_report() -> str:
+    """Ishga tushish va import vaqtlari bo'yicha hisobot matni."""
+    lines = [f"⏱ Ishga tushish vaqti hisoboti (jami {(time.perf_counter() - _STARTED_AT) * 1000:.0f} ms o'tdi):"]
+    for name, secs in sorted(TIMINGS.items(), key=lambda kv: kv[1], reverse=True):
+        lines.append(f"   • {name}: {secs * 1000:.1f} ms")
+    return "\n".join(lines)
@@ -1,12 +1,15 @@
 from typing import List
+import csv
 from telegram.ext import ContextTypes
 from telegram import Update
-import pandas as pd
+import asyncio
 import io
 import logging
 import json
 from datetime import datetime
-from sheets import GC, SHEET_ID, WORKSHEET_TITLE
+from sheets import get_gc, SHEET_ID, WORKSHEET_TITLE
+from startup import lazy_import
+from sender import OUTBOX, BULK, post_logged
 from time import localtime
 
 logger = logging.getLogger(__name__)
@@ -27,61 +30,88 @@ def escape_md(text: str) -> str:
         return ""
     return str(text).replace("\\", "\\\\").replace("*", "\\*").replace("_", "\\_").replace("`", "\\`")
 
-async def split_and_send_text(chat_id, text, context, limit: int = 3900):
-    """Uzoq matnni Telegram limitiga mos bo'lib bo'lib yuboradi."""
-    parts = []
+def split_text(text: str, limit: int = 3900) -> List[str]:
+    """Uzoq matnni qatorlar bo'yicha limitdan oshmaydigan bo'laklarga ajratadi."""
     if len(text) <= limit:
-        parts = [text]
-    else:
-        cur = []
-        cur_len = 0
-        for line in text.splitlines(keepends=True):
-            if cur_len + len(line) > limit:
-                parts.append("".join(cur))
-                cur = [line]
-                cur_len = len(line)
-            else:
-                cur.append(line)
-                cur_len += len(line)
-        if cur:
+        return [text]
+    parts = []
+    cur = []
+    cur_len = 0
+    for line in text.splitlines(keepends=True):
+        if cur_len + len(line) > limit:
             parts.append("".join(cur))
+            cur = [line]
+            cur_len = len(line)
+        else:
+            cur.append(line)
+            cur_len += len(line)
+    if cur:
+        parts.append("".join(cur))
+    return parts
+
+async def split_and_send_text(chat_id, text, context, limit: int = 3900):
+    """Uzoq matnni Telegram limitiga mos bo'lib bo'lib yuboradi."""
+    parts = split_text(text, limit)
 
-    for p in parts:
-        try:
-            await context.bot.send_message(chat_id=chat_id, text=p, parse_mode="Markdown",protect_content=True)
-        except Exception as e:
-            logger.error(f"Matn yuborishda xato: {e}")
+    # Barcha bo'laklar birdan navbatga qo'yiladi; navbat tartib va tezlik limitini saqlaydi
+    futures = [
+        OUTBOX.post(chat_id, lambda p=p: context.bot.send_message(chat_id=chat_id, text=p, parse_mode="Markdown",protect_content=True))
+        for p in parts
+    ]
+    for res in await asyncio.gather(*futures, return_exceptions=True):
+        if isinstance(res, Exception):
+            logger.error(f"Matn yuborishda xato: {res}")
 
 async def send_error_message(chat_id, context, message: str = "❌ Xatolik yuz berdi. Iltimos, qaytadan urinib ko'ring."):
     """Umumiy xato xabarini yuborish."""
     try:
-        await context.bot.send_message(chat_id=chat_id, text=message, parse_mode="Markdown",protect_content=True)
+        await OUTBOX.submit(chat_id, lambda: context.bot.send_message(chat_id=chat_id, text=message, parse_mode="Markdown",protect_content=True))
     except Exception as e:
         logger.error(f"Xato xabarini yuborishda muammo: {e}")
 
 async def delete_previous_page(chat_id, context: ContextTypes.DEFAULT_TYPE):
-    """Avvalgi sahifa xabarini o‘chirish."""
-    if context.user_data.get("page_msg_id"):
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=context.user_data["page_msg_id"])
-        except Exception as e:
-            logger.error(f"Sahifani o‘chirishda xato: {e}")
+    """Avvalgi sahifa xabarini o‘chirish (javobni kutmasdan, past ustuvorlikda)."""
+    msg_id = context.user_data.get("page_msg_id")
+    if msg_id:
+        post_logged(chat_id, lambda: context.bot.delete_message(chat_id=chat_id, message_id=msg_id), "Sahifani o‘chirishda xato", priority=BULK)
         context.user_data["page_msg_id"] = None
 
+EXPORT_XLSX_LIMIT = 2000  # Bundan ko'p natija CSV ko'rinishida yuboriladi (katta XLSX yaratish sekin)
+
+EXPORT_COLUMNS = ["hemisuid", "hemis", "fio", "fakultet", "mutaxassislik", "guruh", "jshshir", "status", "lavozim", "tashkilot", "sanasi"]
+
+def build_excel(results) -> io.BytesIO:
+    """Natijalar ro'yxatidan xotirada Excel fayl yaratadi."""
+    # pandas faqat birinchi eksportda yuklanadi
+    pd = lazy_import("pandas")
+
+    # Ma'lumotlarni DataFrame'ga aylantirish
+    df = pd.DataFrame(results)
+    df = df[[col for col in EXPORT_COLUMNS if col in df.columns]]
+
+    # Excel faylni xotirada yaratish
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    buffer.seek(0)
+    return buffer
+
+def build_csv(results) -> io.BytesIO:
+    """Natijalar ro'yxatidan xotirada CSV fayl yaratadi (Excel ochishi uchun UTF-8 BOM bilan)."""
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    for item in results:
+        writer.writerow([item.get(col, "") for col in EXPORT_COLUMNS])
+    return io.BytesIO(text.getvalue().encode("utf-8-sig"))
+
 async def export_to_excel(results, chat_id, context):
-    """Qidiruv natijalarini Excel faylga aylantirib, Telegram orqali yuborish."""
+    """Qidiruv natijalarini Excel (katta ro'yxatlarda CSV) faylga aylantirib, Telegram orqali yuborish."""
     try:
-        logger.info(f"Excel fayl yaratilmoqda, natijalar soni: {len(results)}")
-        
-        # Ma'lumotlarni DataFrame'ga aylantirish
-        df = pd.DataFrame(results)
-        columns = ["hemisuid", "hemis", "fio", "fakultet", "mutaxassislik", "guruh", "jshshir", "status", "lavozim", "tashkilot", "sanasi"]
-        df = df[[col for col in columns if col in df.columns]]
-
-        # Excel faylni xotirada yaratish
-        buffer = io.BytesIO()
-        df.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
+        as_csv = len(results) > EXPORT_XLSX_LIMIT
+        logger.info(f"{'CSV' if as_csv else 'Excel'} fayl yaratilmoqda, natijalar soni: {len(results)}")
+
+        # Fayl alohida oqimda yaratiladi: katta eksport boshqa chatlarni to'xtatib qo'ymaydi
+        buffer = await asyncio.to_thread(build_csv if as_csv else build_excel, results)
 
         # Fayl hajmini tekshirish (Telegram chegarasi: 50 MB)
         file_size = buffer.getbuffer().nbytes
@@ -90,13 +120,17 @@ async def export_to_excel(results, chat_id, context):
             await send_error_message(chat_id, context, "❌ Fayl hajmi juda katta (50 MB dan ortiq). Iltimos, qidiruvni qisqartiring.")
             return
 
-        # Telegram orqali yuborish
-        await context.bot.send_document(
+        # Telegram orqali yuborish (navbat orqali; qayta urinishda ham fayl to'liq bo'lishi uchun bytes)
+        data = buffer.getvalue()
+        ext = "csv" if as_csv else "xlsx"
+        filename = f"Result-{localtime()[0]}_{localtime()[1]}_{localtime()[2]}_{localtime()[3]}_{localtime()[4]}_{localtime()[5]}_{localtime()[6]}_{localtime()[7]}_{localtime()[8]}.{ext}"
+        caption = "📤 Qidiruv natijalarini CSV fayl sifatida yuklab oling (Excel'da ochiladi)." if as_csv else "📤 Qidiruv natijalarini Excel fayl sifatida yuklab oling."
+        await OUTBOX.submit(chat_id, lambda: context.bot.send_document(
             chat_id=chat_id,
-            document=buffer,
-            filename=f"Result-{localtime()[0]}_{localtime()[1]}_{localtime()[2]}_{localtime()[3]}_{localtime()[4]}_{localtime()[5]}_{localtime()[6]}_{localtime()[7]}_{localtime()[8]}.xlsx",
-            caption="📤 Qidiruv natijalarini Excel fayl sifatida yuklab oling."
-        )
+            document=data,
+            filename=filename,
+            caption=caption
+        ))
         logger.info("Excel fayl muvaffaqiyatli yuborildi.")
     except Exception as e:
         logger.error(f"Excel eksportida xato: {e}")
@@ -139,7 +173,7 @@ async def get_user_stats():
 async def update_sheet_row(row_index: int, values: List[str]):
     """Google Sheets’da qatorni yangilash."""
     try:
-        client = await GC.authorize()
+        client = await get_gc().authorize()
         spreadsheet = await client.open_by_key(SHEET_ID)
         worksheet = await spreadsheet.worksheet(WORKSHEET_TITLE)
         await worksheet.update(f"A{row_index}", [values])
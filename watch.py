@@ -0,0 +1,257 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+from config import REQUIRED_STATUS, REFRESH_INTERVAL
+from sheets import load_rows, derived_async
+from columns import HEMIS_UID, IDX_HEMIS, IDX_FIO, IDX_STAT, IDX_JSH, IDX_GURUH
+from facets import build_facet_index
+from analytics import build_analytics
+from handlers import build_search_keys
+from bulk import build_id_index
+from sender import OUTBOX, BULK, post_logged
+from utils import safe_cell, escape_md, split_text, send_error_message, log_user_action
+
+logger = logging.getLogger(__name__)
+
+WATCHES_FILE = "watches.json"
+CHANGES_FILE = "changes.json"
+
+# Jadval yangilanganda fonda oldindan quriladigan indekslar: handlerlar tayyorini o'qiydi
+PREBUILT_INDEXES = [
+    ("facets", build_facet_index),
+    ("analytics", build_analytics),
+    ("id_index", build_id_index),
+    ("search_keys", build_search_keys),
+]
+
+# Oxirgi solishtirilgan nusxa va uning HEMIS UID -> (qator xeshi, qator indeksi) xaritasi
+_prev_rows = None
+_prev_map = {}
+
+# ---------------- Nusxalarni solishtirish ----------------
+def _is_active(status: str) -> bool:
+    return REQUIRED_STATUS.lower() in (status or "").lower()
+
+def _event(kind: str, uid: str, old_row, new_row):
+    row = new_row if new_row is not None else old_row
+    old_status = safe_cell(old_row, IDX_STAT) if old_row is not None else ""
+    new_status = safe_cell(new_row, IDX_STAT) if new_row is not None else ""
+    if kind == "updated" and old_status != new_status:
+        kind = "status"
+    return {
+        "type": kind,
+        "hemisuid": uid,
+        "fio": safe_cell(row, IDX_FIO),
+        "guruh": safe_cell(row, IDX_GURUH),
+        "old_status": old_status,
+        "new_status": new_status,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+def diff_snapshot(rows):
+    """
+    Yangi nusxani avvalgisi bilan HEMIS UID bo'yicha solishtiradi.
+    Har qator bitta xesh bilan taqqoslanadi; batafsil ishlov faqat o'zgargan qatorlarga.
+    Birinchi chaqiruv faqat boshlang'ich nusxani saqlaydi.
+    """
+    global _prev_rows, _prev_map
+    if rows is _prev_rows:
+        return []
+
+    cur = {}
+    for i in range(1, len(rows)):
+        uid = safe_cell(rows[i], HEMIS_UID)
+        if uid:
+            cur[uid] = (hash(tuple(rows[i])), i)
+
+    events = []
+    if _prev_rows is not None:
+        for uid, (digest, i) in cur.items():
+            old = _prev_map.get(uid)
+            if old is None:
+                events.append(_event("added", uid, None, rows[i]))
+            elif old[0] != digest:
+                events.append(_event("updated", uid, _prev_rows[old[1]], rows[i]))
+        for uid in _prev_map.keys() - cur.keys():
+            events.append(_event("removed", uid, _prev_rows[_prev_map[uid][1]], None))
+
+    _prev_rows, _prev_map = rows, cur
+    return events
+
+def _append_changes(events):
+    """O'zgarishlar jurnaliga yozish."""
+    try:
+        with open(CHANGES_FILE, "a") as f:
+            for ev in events:
+                json.dump(ev, f, ensure_ascii=False)
+                f.write("\n")
+    except Exception as e:
+        logger.error(f"O‘zgarishlar jurnalini saqlashda xato: {e}")
+
+# ---------------- Kuzatuvlar ----------------
+def _load_watches():
+    try:
+        with open(WATCHES_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Kuzatuvlarni o‘qishda xato: {e}")
+        return {}
+
+def _save_watches(watches):
+    with open(WATCHES_FILE, "w") as f:
+        json.dump({k: v for k, v in watches.items() if v}, f, ensure_ascii=False)
+
+def _group_key(guruh: str) -> str:
+    return f"guruh:{guruh.strip().lower()}"
+
+def _format_event(ev) -> str:
+    old_icon = "🟢" if _is_active(ev["old_status"]) else "🔴"
+    new_icon = "🟢" if _is_active(ev["new_status"]) else "🔴"
+    return (
+        f"👤 *{escape_md(ev['fio'])}* (`{escape_md(ev['guruh'])}`)\n"
+        f"🆔 HEMIS UID: `{escape_md(ev['hemisuid'])}`\n"
+        f"{old_icon} {escape_md(ev['old_status'] or '-')} → {new_icon} {escape_md(ev['new_status'] or '-')}"
+    )
+
+def notify(bot, events):
+    """Holati o'zgargan talabalar bo'yicha obunachilarga bildirishnoma (chat bo'yicha jamlanadi)."""
+    watches = _load_watches()
+    if not watches:
+        return
+    per_chat = defaultdict(list)
+    for ev in events:
+        if ev["type"] != "status":
+            continue
+        chats = set(watches.get(f"uid:{ev['hemisuid']}", [])) | set(watches.get(_group_key(ev["guruh"]), []))
+        for chat_id in chats:
+            per_chat[chat_id].append(ev)
+
+    for chat_id, evs in per_chat.items():
+        text = "🔔 *Holat o‘zgardi:*\n\n" + "\n\n".join(_format_event(ev) for ev in evs)
+        for part in split_text(text):
+            post_logged(
+                chat_id,
+                lambda part=part, chat_id=chat_id: bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown", protect_content=True),
+                "Bildirishnoma yuborishda xato",
+                priority=BULK,
+            )
+    if per_chat:
+        logger.info(f"Holat bildirishnomalari: {len(per_chat)} chat.")
+
+# ---------------- Fonda yangilash ----------------
+async def prebuild_indexes(rows):
+    """Joriy nusxa indekslarini alohida oqimda quradi (allaqachon qurilganlari o'tkazib yuboriladi)."""
+    for name, builder in PREBUILT_INDEXES:
+        try:
+            await derived_async(name, rows, builder)
+        except Exception as e:
+            logger.error(f"{name} indeksini qurishda xato: {e}")
+
+async def refresh_job(context: ContextTypes.DEFAULT_TYPE):
+    """Jadvalni qayta o'qiydi, avvalgi nusxa bilan solishtiradi, obunachilarni xabardor qiladi va indekslarni yangilaydi."""
+    try:
+        rows = await load_rows(force=True)
+        events = diff_snapshot(rows)
+        if events:
+            _append_changes(events)
+            stats = defaultdict(int)
+            for ev in events:
+                stats[ev["type"]] += 1
+            logger.info(f"Jadvalda o‘zgarishlar: {dict(stats)}")
+            notify(context.bot, events)
+        await prebuild_indexes(rows)
+    except Exception as e:
+        logger.error(f"Jadvalni yangilashda xato: {e}")
+
+def register_refresh_job(app: Application):
+    if app.job_queue is None:
+        logger.warning("JobQueue mavjud emas, jadvalni fonda yangilash o‘chirilgan.")
+        return
+    app.job_queue.run_repeating(refresh_job, interval=REFRESH_INTERVAL, first=10, name="sheet_refresh")
+
+# ---------------- Buyruqlar ----------------
+def _find_uid(rows, ident: str):
+    """HEMIS UID, HEMIS ID yoki JSHSHIR bo'yicha (HEMIS UID, F.I.O.) qaytaradi."""
+    for r in rows[1:]:
+        if ident in (safe_cell(r, HEMIS_UID), safe_cell(r, IDX_HEMIS), safe_cell(r, IDX_JSH)):
+            return safe_cell(r, HEMIS_UID), safe_cell(r, IDX_FIO)
+    return None, None
+
+async def _resolve_key(args):
+    """Buyruq argumentlaridan kuzatuv kaliti va tavsifini aniqlaydi."""
+    rows = await load_rows()
+    if args[0].lower() == "guruh" and len(args) > 1:
+        name = " ".join(args[1:]).strip()
+        groups = {g.lower(): g for g in (await derived_async("facets", rows, build_facet_index)).values["guruh"]}
+        if name.lower() not in groups:
+            return None, None
+        return _group_key(name), f"👥 Guruh: {groups[name.lower()]}"
+    uid, fio = _find_uid(rows, " ".join(args).strip())
+    if not uid:
+        return None, None
+    return f"uid:{uid}", f"👤 {fio} ({uid})"
+
+async def watch_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/kuzat <HEMIS UID | HEMIS ID | JSHSHIR> yoki /kuzat guruh <nomi>"""
+    chat_id = update.effective_chat.id
+    if not context.args:
+        await send_error_message(chat_id, context, "❌ Format: `/kuzat <HEMIS UID / HEMIS ID / JSHSHIR>` yoki `/kuzat guruh <guruh nomi>`")
+        return
+    try:
+        key, label = await _resolve_key(context.args)
+        if not key:
+            await send_error_message(chat_id, context, "❌ *Hech qanday ma'lumot topilmadi.*")
+            return
+        watches = _load_watches()
+        chats = watches.setdefault(key, [])
+        if chat_id not in chats:
+            chats.append(chat_id)
+            _save_watches(watches)
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text(f"🔔 Kuzatuvga qo‘shildi: {label}\nHolat o‘zgarsa xabar beraman."))
+        await log_user_action(chat_id, f"kuzat_{key}")
+    except Exception as e:
+        logger.error(f"Kuzatuv qo‘shishda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Kuzatuv qo‘shishda xato: {str(e)}")
+
+async def watch_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/kuzatuvlar — joriy chat kuzatuvlari."""
+    chat_id = update.effective_chat.id
+    keys = [k for k, chats in _load_watches().items() if chat_id in chats]
+    if not keys:
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text("📭 Sizda kuzatuvlar yo‘q."))
+        return
+    lines = ["🔔 *Kuzatuvlaringiz:*\n"] + [f"• `{escape_md(k)}`" for k in sorted(keys)]
+    await OUTBOX.submit(chat_id, lambda: update.message.reply_text("\n".join(lines), parse_mode="Markdown"))
+
+async def watch_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/kuzat_bekor [kalit] — kuzatuvni bekor qilish (kalit ko'rsatilmasa, barchasi)."""
+    chat_id = update.effective_chat.id
+    try:
+        watches = _load_watches()
+        if context.args:
+            # /kuzatuvlar ro'yxatidagi kalitni to'g'ridan-to'g'ri ham qabul qilamiz
+            key = " ".join(context.args).strip()
+            if key not in watches:
+                key, _ = await _resolve_key(context.args)
+            keys = [key] if key else []
+        else:
+            keys = list(watches)
+        removed = 0
+        for key in keys:
+            if chat_id in watches.get(key, []):
+                watches[key].remove(chat_id)
+                removed += 1
+        if not removed:
+            await send_error_message(chat_id, context, "❌ *Hech qanday ma'lumot topilmadi.*")
+            return
+        _save_watches(watches)
+        await OUTBOX.submit(chat_id, lambda: update.message.reply_text("✅ Kuzatuv bekor qilindi."))
+        await log_user_action(chat_id, "kuzat_bekor")
+    except Exception as e:
+        logger.error(f"Kuzatuvni bekor qilishda xato: {e}")
+        await send_error_message(chat_id, context, f"❌ Kuzatuvni bekor qilishda xato: {str(e)}")